@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,19 +78,111 @@ TEMPLATES = [
 WSGI_APPLICATION = 'app.wsgi.application'
 
 
+# Serve the async actions of the API viewsets from coroutines, which only
+# pays off under ASGI, so app.asgi turns it on
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL with health checks of persistent connections
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds a connection is kept for the next requests, 0 closes it
+        # after each request. Under ASGI requests run in threads of their
+        # own, which cannot hand a connection on, so it defaults to 0.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DB_CONN_MAX_AGE',
+            0 if ASYNC_VIEWS else 60,
+        )),
+        # Ping reused connections on their first use in a request
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS',
+            '1',
+        ) == '1',
+    }
+}
+
+# Streaming replicas of the default database, as a comma separated list
+# of hosts sharing its name and credentials. Tests read them from the
+# test database of default.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    host.strip()
+    for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+    if host.strip()
+):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Seconds a user reads from the primary after a write, longer than the
+# replication lag. Pins are kept in this cache alias, which must be
+# shared by every process, e.g. memcached
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+DATABASE_REPLICA_PIN_CACHE = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 300)),
+    },
+    'token_auth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'token-auth',
+        'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('TOKEN_AUTH_CACHE_MAX_ENTRIES', 5000)
+            ),
+        },
+    },
+    'suggest': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'suggest',
+        'TIMEOUT': int(os.environ.get('SUGGEST_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('SUGGEST_CACHE_MAX_ENTRIES', 2000)
+            ),
+        },
+    },
 }
 
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # Local memory evicts the least recently used entries past this size
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    }
+
+RECIPE_CACHE_ALIAS = 'default'
+# In-process least recently used cache of tag and ingredient suggestions
+RECIPE_SUGGEST_CACHE_ALIAS = 'suggest'
+
+# In-process cache of token owners, optionally backed by a shared cache
+# alias (e.g. 'default' when it points to memcached)
+TOKEN_AUTH_LOCAL_CACHE = 'token_auth'
+TOKEN_AUTH_SHARED_CACHE = os.environ.get('TOKEN_AUTH_SHARED_CACHE')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -128,12 +222,42 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Threads generating recipe image renditions, 0 processes them inline
+IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2))
+
+# Threads the async views run their concurrent queries in, each holding a
+# connection, instead of the small default executor of the event loop
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', 20))
+
+# Request instrumentation of core.middleware.MetricsMiddleware
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '1') == '1'
+METRICS_SLOW_REQUEST_SECONDS = float(
+    os.environ.get('METRICS_SLOW_REQUEST_SECONDS', 1.0)
+)
+# Number of most repeated statements logged with a slow request
+METRICS_SLOW_REQUEST_TOP_SQL = int(
+    os.environ.get('METRICS_SLOW_REQUEST_TOP_SQL', 5)
+)
+# Bearer token required by the metrics endpoint, which is disabled
+# without it unless DEBUG is on
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson backed JSON when installed, DRF JSON otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,69 @@
+"""
+ASGI handling of the API requests
+"""
+import django
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.handlers import asgi
+from django.db import connections
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ ASGI handler giving every request a thread of its own
+
+    Django 3.2 runs the sync code of all requests (sync middleware and
+    views, signals, thread sensitive sync_to_async calls) on one shared
+    thread, so a request waiting on the database holds up the others.
+    Each request gets its own thread instead, closing its connections
+    when it ends.
+
+    Django 3.2 also iterates streaming responses on the event loop,
+    where generators querying the database (recipe exports and imports)
+    fail. Their chunks are read in the request thread, one at a time,
+    and sent as they come.
+    """
+
+    async def __call__(self, scope, receive, send):
+        """ Handle a request with its sync code in a thread of its own """
+        async with ThreadSensitiveContext():
+            try:
+                await super().__call__(scope, receive, send)
+            finally:
+                # The thread ends with the request, its connections too
+                await sync_to_async(connections.close_all)()
+
+    async def send_response(self, response, send):
+        """ Send a response, reading streamed chunks from a thread """
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        parts = iter(response)
+        # Django sends the headers then an empty body closing the stream,
+        # the parts go in between
+        response.streaming_content = []
+        read = sync_to_async(next)
+
+        async def send_parts(message):
+            if (
+                message['type'] == 'http.response.body'
+                and not message.get('more_body')
+            ):
+                while True:
+                    part = await read(parts, None)
+                    if part is None:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            await send(message)
+
+        await super().send_response(response, send_parts)
+
+
+def get_asgi_application():
+    """ Return the ASGI application of the project """
+    django.setup(set_prefix=False)
+
+    return ASGIHandler()
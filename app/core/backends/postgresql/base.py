@@ -0,0 +1,64 @@
+"""
+PostgreSQL backend checking persistent connections before reusing them
+"""
+import time
+
+from django.db.backends.postgresql import base
+
+from core import metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """ Connection checked once per request when CONN_HEALTH_CHECKS is set
+
+    With CONN_MAX_AGE, connections outlive requests and may be dropped by
+    the server or a proxy in between. The first use in a request pings a
+    reused connection and reconnects if it is gone, instead of failing
+    the request. Every first use is counted as a checkout, with the time
+    spent getting a usable connection.
+
+    Only close_if_unusable_or_obsolete, run by close_old_connections at
+    the start and end of requests, ends a checkout. Code using
+    connections outside of requests, like the worker threads of
+    recipe.async_views.in_thread, calls close_old_connections after its
+    work, or its next work is neither checked nor counted.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_checks = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS',
+            False,
+        )
+        self.checked_out = False
+
+    def ensure_connection(self):
+        """ Check out the connection on its first use in a request """
+        if self.checked_out:
+            return super().ensure_connection()
+
+        start = time.perf_counter()
+        reused = self.connection is not None
+        # Set first as connecting runs queries, which ensure the connection
+        self.checked_out = True
+        try:
+            if reused and self.health_checks and not self.in_atomic_block:
+                if not self.is_usable():
+                    metrics.DB_HEALTH_CHECK_FAILURES.inc(alias=self.alias)
+                    self.close()
+                    reused = False
+            super().ensure_connection()
+        except Exception:
+            self.checked_out = False
+            raise
+
+        metrics.DB_CHECKOUTS.inc(alias=self.alias, reused=str(reused).lower())
+        metrics.DB_CHECKOUT_DURATION.observe(
+            time.perf_counter() - start,
+            alias=self.alias,
+        )
+
+    def close_if_unusable_or_obsolete(self):
+        """ Release the connection at the start and end of requests """
+        super().close_if_unusable_or_obsolete()
+        self.checked_out = False
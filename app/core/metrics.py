@@ -0,0 +1,320 @@
+"""
+Per request instrumentation and in-process metric histograms
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework import serializers
+
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """ Measures collected while handling a request """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+        self.statements = Counter()
+        # Async views run the queries of a request in several threads
+        self._lock = threading.Lock()
+
+    def record_query(self, execute, sql, params, many, context):
+        """ Execute wrapper counting and timing the queries """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.db_time += duration
+                self.queries += 1
+                self.statements[sql] += 1
+
+    def repeated_statements(self, limit):
+        """ Return the most repeated statements with their counts """
+        return [
+            (sql, count)
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """ Execute wrapper adding queries to the current request, if any """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install(sender=None, connection=None, **kwargs):
+    """ Measure the queries of a database connection
+
+    The wrapper stays on the connection and finds the request through a
+    context variable, which also reaches the worker threads sync code
+    runs in under ASGI.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def collect(metrics=None):
+    """ Make a RequestMetrics current for the enclosed code, a new one
+    unless the measures of a request are resumed
+    """
+    if metrics is None:
+        metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timer(name):
+    """ Add the time spent in the enclosed code to the current request """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.timings[name] += time.perf_counter() - start
+
+
+class Histogram:
+    """ Cumulative histogram of observations per label values """
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        """ Record an observation for label values """
+        key = tuple(labels[label] for label in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'buckets': [0] * len(self.buckets),
+                    'count': 0,
+                    'sum': 0.0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['count'] += 1
+            series['sum'] += value
+
+    def clear(self):
+        """ Forget every observation """
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """ Return the lines of the Prometheus text format """
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            for key, data in series:
+                labels = ','.join(
+                    f'{label}="{_escape(value)}"'
+                    for label, value in zip(self.labels, key)
+                )
+                prefix = f'{labels},' if labels else ''
+                for bound, count in zip(self.buckets, data['buckets']):
+                    lines.append(
+                        f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{{prefix}le="+Inf"}} {data["count"]}'
+                )
+                lines.append(f'{self.name}_sum{{{labels}}} {data["sum"]}')
+                lines.append(f'{self.name}_count{{{labels}}} {data["count"]}')
+
+        return lines
+
+
+class Total:
+    """ Monotonic count per label values """
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, amount=1, **labels):
+        """ Add to the count of label values """
+        key = tuple(labels[label] for label in self.labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        """ Return the count of label values """
+        key = tuple(labels[label] for label in self.labels)
+        with self._lock:
+            return self._series.get(key, 0)
+
+    def clear(self):
+        """ Forget every count """
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """ Return the lines of the Prometheus text format """
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter',
+        ]
+        with self._lock:
+            for key, count in sorted(self._series.items()):
+                labels = ','.join(
+                    f'{label}="{_escape(value)}"'
+                    for label, value in zip(self.labels, key)
+                )
+                lines.append(f'{self.name}{{{labels}}} {count}')
+
+        return lines
+
+
+def _escape(value):
+    """ Escape a label value """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n',
+        '\\n',
+    )
+
+
+REQUEST_LABELS = ('view', 'action', 'method', 'status')
+VIEW_LABELS = ('view', 'action')
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Time spent handling requests.',
+    REQUEST_LABELS,
+    DURATION_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries executed per request.',
+    VIEW_LABELS,
+    QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per request.',
+    VIEW_LABELS,
+    DURATION_BUCKETS,
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    'http_request_serializer_duration_seconds',
+    'Time spent serializing response data per request.',
+    VIEW_LABELS,
+    DURATION_BUCKETS,
+)
+DB_CHECKOUT_DURATION = Histogram(
+    'db_connection_checkout_seconds',
+    'Time spent getting a usable connection, health check included.',
+    ('alias',),
+    DURATION_BUCKETS,
+)
+HISTOGRAMS = [
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUEST_DB_DURATION,
+    REQUEST_SERIALIZER_DURATION,
+    DB_CHECKOUT_DURATION,
+]
+
+DB_CHECKOUTS = Total(
+    'db_connection_checkouts_total',
+    'Connections used by a request, reused or newly opened.',
+    ('alias', 'reused'),
+)
+DB_HEALTH_CHECK_FAILURES = Total(
+    'db_connection_health_check_failures_total',
+    'Persistent connections found unusable and reopened.',
+    ('alias',),
+)
+DB_READ_REQUESTS = Total(
+    'db_read_requests_total',
+    'Safe requests by the database serving their reads, the primary '
+    'when the user wrote recently.',
+    ('alias',),
+)
+COUNTERS = [DB_CHECKOUTS, DB_HEALTH_CHECK_FAILURES, DB_READ_REQUESTS]
+
+
+def observe(metrics, total, view, action, method, status):
+    """ Add the measures of a request to the histograms """
+    REQUEST_DURATION.observe(
+        total,
+        view=view,
+        action=action,
+        method=method,
+        status=status,
+    )
+    REQUEST_QUERIES.observe(metrics.queries, view=view, action=action)
+    REQUEST_DB_DURATION.observe(metrics.db_time, view=view, action=action)
+    REQUEST_SERIALIZER_DURATION.observe(
+        metrics.timings['serializer'],
+        view=view,
+        action=action,
+    )
+
+
+def render_prometheus():
+    """ Return every metric in the Prometheus text format """
+    lines = []
+    for metric in [*HISTOGRAMS, *COUNTERS]:
+        lines.extend(metric.render())
+
+    return '\n'.join(lines) + '\n'
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """ List serializer adding the time spent in data to the request """
+
+    @property
+    def data(self):
+        with timer('serializer'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """ Add the time spent in the data of a serializer to the request
+
+    Lists are timed by declaring TimedListSerializer as the
+    list_serializer_class of the serializer Meta.
+    """
+
+    @property
+    def data(self):
+        with timer('serializer'):
+            return super().data
@@ -0,0 +1,139 @@
+"""
+Middleware shared by the APIs
+"""
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """ Measure the queries and timings of every request
+
+    Measures are aggregated into the histograms of core.metrics per view
+    and action, returned in a Server-Timing header and logged with the
+    most repeated SQL for requests slower than the configured threshold.
+    Streaming responses are recorded once their body is sent, with the
+    queries made while iterating it; their Server-Timing header is only
+    a measure of the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark instances as coroutine functions for the handler
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        # Connections opened before the metrics were loaded
+        for connection in connections.all():
+            metrics.install(connection=connection)
+        with metrics.collect() as measures:
+            response = self.get_response(request)
+
+        return self._finish(request, response, measures, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with metrics.collect() as measures:
+            response = await self.get_response(request)
+
+        return self._finish(request, response, measures, start)
+
+    def _finish(self, request, response, measures, start):
+        """ Annotate the response of a request and record its measures,
+        after its body for streaming responses
+        """
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = self._server_timing(
+                measures,
+                time.perf_counter() - start,
+            )
+        if response.streaming:
+            response.streaming_content = self._measure_stream(
+                iter(response.streaming_content),
+                request,
+                response,
+                measures,
+                start,
+            )
+        else:
+            self._record(request, response, measures, start)
+
+        return response
+
+    def _measure_stream(self, iterator, request, response, measures, start):
+        """ Iterate a streaming body adding its queries to the request """
+        try:
+            while True:
+                # Resumed around each chunk only, the context of the
+                # generator is the one of its consumer
+                with metrics.collect(measures):
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self._record(request, response, measures, start)
+
+    def _record(self, request, response, measures, start):
+        """ Record the measures of a request """
+        total = time.perf_counter() - start
+        view, action = self._get_view_action(request)
+        metrics.observe(
+            measures,
+            total,
+            view=view,
+            action=action,
+            method=request.method,
+            status=response.status_code,
+        )
+        if total >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            self._log_slow_request(request, measures, total)
+
+    def _get_view_action(self, request):
+        """ Return the view name and viewset action of a request """
+        match = request.resolver_match
+        if match is None:
+            return '', ''
+        # Viewsets map the request method to the action they run
+        actions = getattr(match.func, 'actions', None) or {}
+
+        return match.view_name, actions.get(request.method.lower(), '')
+
+    def _server_timing(self, measures, total):
+        """ Return the Server-Timing header value of a request """
+        return ', '.join([
+            f'db;dur={measures.db_time * 1000:.1f};'
+            f'desc="{measures.queries} queries"',
+            f'serializer;dur={measures.timings["serializer"] * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    def _log_slow_request(self, request, measures, total):
+        """ Log a slow request with its most repeated SQL """
+        repeated = measures.repeated_statements(
+            settings.METRICS_SLOW_REQUEST_TOP_SQL
+        )
+        logger.warning(
+            'Slow request %s %s: %.0f ms, %d queries in %.0f ms%s',
+            request.method,
+            request.get_full_path(),
+            total * 1000,
+            measures.queries,
+            measures.db_time * 1000,
+            ''.join(f'\n  {count}x {sql}' for sql, count in repeated),
+        )
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:42
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """ Merge tags and ingredients sharing a name into the oldest one """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, relation in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        column = f'{model_name.lower()}_id'
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'),
+            total=Count('id'),
+        ).filter(total__gt=1)
+
+        for duplicate in duplicates:
+            keep = duplicate['keep']
+            extra_ids = list(model.objects.filter(
+                user=duplicate['user'],
+                name=duplicate['name'],
+            ).exclude(id=keep).values_list('id', flat=True))
+            linked = set(through.objects.filter(
+                **{column: keep}
+            ).values_list('recipe_id', flat=True))
+            moved = set(through.objects.filter(
+                **{f'{column}__in': extra_ids}
+            ).values_list('recipe_id', flat=True)) - linked
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{column: keep})
+                for recipe_id in moved
+            ])
+            through.objects.filter(**{f'{column}__in': extra_ids}).delete()
+            model.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
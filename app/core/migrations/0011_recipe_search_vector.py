@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Same weights and configuration as RecipeQuerySet.search_vector()
+BACKFILL_SEARCH_VECTORS = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_tag.name, ' ')
+        FROM core_recipe_tags
+        JOIN core_tag ON core_tag.id = core_recipe_tags.tag_id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_ingredient.name, ' ')
+        FROM core_recipe_ingredients
+        JOIN core_ingredient
+            ON core_ingredient.id = core_recipe_ingredients.ingredient_id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce(description, '')), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_image_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTORS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:12
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Same values as RecipeQuerySet.relation_ids()
+BACKFILL_RELATION_IDS = """
+UPDATE core_recipe SET
+    tag_ids = ARRAY(
+        SELECT tag_id FROM core_recipe_tags
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+        ORDER BY tag_id
+    ),
+    ingredient_ids = ARRAY(
+        SELECT ingredient_id FROM core_recipe_ingredients
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+        ORDER BY ingredient_id
+    )
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(BACKFILL_RELATION_IDS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='recipe_tag_ids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ingredient_ids'], name='recipe_ingredient_ids_idx'),
+        ),
+    ]
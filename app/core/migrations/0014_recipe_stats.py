@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Same totals as RecipeQuerySet.add_to_stats() over every recipe
+BACKFILL_STATS = """
+INSERT INTO core_recipestats
+    (user_id, recipe_count, price_total, time_minutes_total)
+SELECT user_id, COUNT(*), SUM(price), SUM(time_minutes)
+FROM core_recipe GROUP BY user_id;
+INSERT INTO core_tagstats (tag_id, recipe_count)
+SELECT tag_id, COUNT(*) FROM core_recipe_tags GROUP BY tag_id;
+INSERT INTO core_ingredientstats (ingredient_id, recipe_count)
+SELECT ingredient_id, COUNT(*) FROM core_recipe_ingredients
+GROUP BY ingredient_id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_relation_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientStats',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.ingredient')),
+                ('recipe_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to='core.user')),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagStats',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.tag')),
+                ('recipe_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL_STATS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:18
+
+from django.db import migrations
+
+
+# The link tables are created by the many to many fields, so their
+# (object, recipe) indexes, which let counting and existence checks per
+# tag or ingredient scan the index only, are added with SQL.
+INDEXES = [
+    ('core_recipe_tags', 'tag_id', 'core_recipe_tags_tag_recipe_idx'),
+    (
+        'core_recipe_ingredients',
+        'ingredient_id',
+        'core_recipe_ingredients_ingredient_recipe_idx',
+    ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON {table} ({column}, recipe_id)',
+            f'DROP INDEX {name}',
+        )
+        for table, column, name in INDEXES
+    ]
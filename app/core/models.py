@@ -5,13 +5,27 @@ import uuid
 import os
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connections, models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+# Text search configuration of the recipe search vectors and queries
+SEARCH_CONFIG = 'english'
+
+# Recipe columns holding the sorted ids of each many to many relation
+RELATION_ID_FIELDS = {
+    'tags': 'tag_ids',
+    'ingredients': 'ingredient_ids',
+}
+
 
 def recipe_image_file_path(instance, filename):
     """ Generate filepath for new recipe image """
@@ -44,6 +58,90 @@ class UserManager(BaseUserManager):
         return user
 
 
+class NamedObjectManager(models.Manager):
+    """ Manager for objects whose name is unique per user """
+
+    def get_or_create_by_names(self, user, names):
+        """ Return objects for names, creating the missing ones in bulk """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        found = {
+            obj.name: obj
+            for obj in self.filter(user=user, name__in=names)
+        }
+        missing = [name for name in names if name not in found]
+        if missing:
+            # Ignoring conflicts keeps concurrent writers safe, but leaves
+            # the new objects without a pk so they are fetched back.
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            found.update(
+                (obj.name, obj)
+                for obj in self.filter(user=user, name__in=missing)
+            )
+
+        return [found[name] for name in names]
+
+
+class CounterManager(models.Manager):
+    """ Manager for rows of running totals keyed by their primary key """
+
+    def add(self, deltas, create=True):
+        """ Add {pk: {field: delta}} deltas to the totals of rows
+
+        Missing rows are created from the deltas when create is true, in
+        one upsert so concurrent writers cannot lose increments. Otherwise
+        only existing rows are updated, which is what removals need as
+        their rows may be going away in the same transaction.
+        """
+        deltas = {
+            pk: values
+            for pk, values in deltas.items()
+            if any(values.values())
+        }
+        if not deltas:
+            return
+        if not create:
+            groups = {}
+            for pk, values in deltas.items():
+                groups.setdefault(tuple(values.items()), []).append(pk)
+            for values, pks in groups.items():
+                self.filter(pk__in=pks).update(**{
+                    field: models.F(field) + delta
+                    for field, delta in values
+                })
+            return
+
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        meta = self.model._meta
+        fields = list(next(iter(deltas.values())))
+        columns = [meta.get_field(field).column for field in fields]
+        table = quote(meta.db_table)
+        placeholders = ', '.join(['%s'] * (len(fields) + 1))
+        params = []
+        for pk, values in deltas.items():
+            params.append(pk)
+            params.extend(values[field] for field in fields)
+        sql = (
+            f'INSERT INTO {table} '
+            f'({", ".join(map(quote, [meta.pk.column, *columns]))}) '
+            f'VALUES {", ".join([f"({placeholders})"] * len(deltas))} '
+            f'ON CONFLICT ({quote(meta.pk.column)}) DO UPDATE SET '
+            + ', '.join(
+                f'{quote(column)} = {table}.{quote(column)} '
+                f'+ EXCLUDED.{quote(column)}'
+                for column in columns
+            )
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """ User in the system """
     email = models.EmailField(max_length=255, unique=True)
@@ -56,6 +154,98 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class ArraySubquery(models.Subquery):
+    """ Subquery returning the values of its single column as an array """
+    template = 'ARRAY(%(subquery)s)'
+    output_field = ArrayField(models.BigIntegerField())
+
+
+class RecipeQuerySet(models.QuerySet):
+    """ QuerySet for recipes """
+
+    def touch(self):
+        """ Mark the recipes as modified now and refresh their derived data """
+        return self.update(updated_at=timezone.now(), **self.derived_fields())
+
+    def refresh_derived(self):
+        """ Refresh the search text and relation ids of the recipes """
+        return self.update(**self.derived_fields())
+
+    def update_search_vector(self):
+        """ Refresh the search vectors of the recipes """
+        return self.update(search_vector=self.search_vector())
+
+    def add_to_stats(self, sign=1):
+        """ Add the recipes to the stats of their users, tags and
+        ingredients, or remove them with a sign of -1
+        """
+        totals = self.order_by().values('user').annotate(
+            count=models.Count('id'),
+            price=models.Sum('price'),
+            time_minutes=models.Sum('time_minutes'),
+        )
+        RecipeStats.objects.add({
+            row['user']: {
+                'recipe_count': sign * row['count'],
+                'price_total': sign * row['price'],
+                'time_minutes_total': sign * row['time_minutes'],
+            }
+            for row in totals
+        }, create=sign > 0)
+        for relation, model in STATS_MODELS.items():
+            through = getattr(Recipe, relation).through
+            column = Recipe._meta.get_field(relation).m2m_reverse_name()
+            counts = through.objects.filter(
+                recipe__in=self.values('pk'),
+            ).values(column).annotate(count=models.Count('id'))
+            model.objects.add({
+                row[column]: {'recipe_count': sign * row['count']}
+                for row in counts
+            }, create=sign > 0)
+
+    def derived_fields(self):
+        """ Return the expressions of the columns derived from relations """
+        fields = {'search_vector': self.search_vector()}
+        for relation, field in RELATION_ID_FIELDS.items():
+            fields[field] = self.relation_ids(relation)
+
+        return fields
+
+    def relation_ids(self, relation):
+        """ Return the expression of the sorted related ids of a recipe """
+        through = getattr(Recipe, relation).through
+        column = Recipe._meta.get_field(relation).m2m_reverse_name()
+
+        return ArraySubquery(
+            through.objects.filter(
+                recipe_id=models.OuterRef('pk'),
+            ).order_by(column).values(column),
+        )
+
+    def search_vector(self):
+        """ Return the search vector expression of a recipe row
+
+        Tag and ingredient names are aggregated by correlated subqueries,
+        so the expression can be used in an UPDATE of many recipes.
+        """
+        vector = SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        relations = [('tags', 'tag'), ('ingredients', 'ingredient')]
+        for relation, related in relations:
+            names = getattr(Recipe, relation).through.objects.filter(
+                recipe_id=models.OuterRef('pk'),
+            ).values('recipe_id').annotate(
+                names=StringAgg(f'{related}__name', delimiter=' '),
+            ).values('names')
+            vector += SearchVector(
+                models.Subquery(names),
+                weight='B',
+                config=SEARCH_CONFIG,
+            )
+        vector += SearchVector('description', weight='C', config=SEARCH_CONFIG)
+
+        return vector
+
+
 class Recipe(models.Model):
     """ Recipe object """
     user = models.ForeignKey(
@@ -70,11 +260,80 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_renditions = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Copies of the tag and ingredient links for indexed filtering
+    tag_ids = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+    )
+    ingredient_ids = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            GinIndex(fields=['tag_ids'], name='recipe_tag_ids_idx'),
+            GinIndex(
+                fields=['ingredient_ids'],
+                name='recipe_ingredient_ids_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class ImageJob(models.Model):
+    """ Queued processing of an uploaded recipe image """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    image = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'updated_at'],
+                name='imagejob_status_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.image} ({self.status})'
+
+
 class Tag(models.Model):
     """ Tag for filtering recipes """
     name = models.CharField(max_length=255)
@@ -83,6 +342,23 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = NamedObjectManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_name_per_user',
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                fields=['name'],
+                name='tag_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -95,5 +371,83 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = NamedObjectManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user',
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                fields=['name'],
+                name='ingredient_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class RecipeStats(models.Model):
+    """ Running totals of the recipes of a user """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats',
+    )
+    recipe_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+    time_minutes_total = models.BigIntegerField(default=0)
+
+    objects = CounterManager()
+
+    def __str__(self):
+        return f'{self.user} ({self.recipe_count} recipes)'
+
+
+class TagStats(models.Model):
+    """ Running count of the recipes of a tag """
+    tag = models.OneToOneField(
+        Tag,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    recipe_count = models.IntegerField(default=0)
+
+    objects = CounterManager()
+
+    def __str__(self):
+        return f'{self.tag} ({self.recipe_count} recipes)'
+
+
+class IngredientStats(models.Model):
+    """ Running count of the recipes of an ingredient """
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    recipe_count = models.IntegerField(default=0)
+
+    objects = CounterManager()
+
+    def __str__(self):
+        return f'{self.ingredient} ({self.recipe_count} recipes)'
+
+
+# Stats models counting the recipes of each relation
+STATS_MODELS = {
+    'tags': TagStats,
+    'ingredients': IngredientStats,
+}
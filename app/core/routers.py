@@ -0,0 +1,103 @@
+"""
+Database routing of reads to the replicas of the default database
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from core import metrics
+
+
+class ReadState:
+    """ Database the reads of a request go to, the primary by default """
+
+    def __init__(self):
+        self.alias = None
+
+
+_read_state = ContextVar('read_state', default=None)
+
+
+@contextmanager
+def replica_reads():
+    """ Let the reads of the enclosed request go to a replica once
+    route_reads is called, e.g. after authentication
+    """
+    token = _read_state.set(ReadState())
+    try:
+        yield
+    finally:
+        _read_state.reset(token)
+
+
+def route_reads(user_id):
+    """ Send the next reads of the current request of a user to a random
+    replica, unless the user wrote recently
+
+    One replica serves the whole request, so its reads are consistent
+    with each other. Without replicas or outside replica_reads, reads
+    stay on the primary.
+    """
+    state = _read_state.get()
+    if state is None or not settings.DATABASE_REPLICAS:
+        return
+    if is_pinned(user_id):
+        state.alias = None
+        metrics.DB_READ_REQUESTS.inc(alias=DEFAULT_DB_ALIAS)
+    else:
+        state.alias = random.choice(settings.DATABASE_REPLICAS)
+        metrics.DB_READ_REQUESTS.inc(alias=state.alias)
+
+
+def _pin_key(user_id):
+    """ Return the cache key pinning a user to the primary """
+    return f'replica:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """ Read from the primary for a while after a write of a user, until
+    the replicas have caught up with it
+    """
+    if settings.DATABASE_REPLICAS:
+        caches[settings.DATABASE_REPLICA_PIN_CACHE].set(
+            _pin_key(user_id),
+            True,
+            settings.DATABASE_REPLICA_PIN_SECONDS,
+        )
+
+
+def is_pinned(user_id):
+    """ Return whether a user wrote recently and reads from the primary """
+    return bool(
+        settings.DATABASE_REPLICAS
+        and caches[settings.DATABASE_REPLICA_PIN_CACHE].get(_pin_key(user_id))
+    )
+
+
+class ReplicaRouter:
+    """ Route the reads of replica_reads requests to their replica
+
+    Writes, migrations and every other read use the default database.
+    Replicas hold the same data, so objects may relate across them.
+    """
+
+    def db_for_read(self, model, **hints):
+        """ Return the replica of the current request, if any """
+        state = _read_state.get()
+        return state.alias if state is not None else None
+
+    def db_for_write(self, model, **hints):
+        """ Write to the primary """
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """ Objects of the primary and its replicas are the same rows """
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """ Replicas follow the schema of the primary """
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,145 @@
+"""
+Signal handlers keeping denormalized model data up to date
+"""
+from decimal import Decimal
+
+from django.db.models import Count
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.models import Recipe, RecipeStats, Tag, Ingredient, STATS_MODELS
+
+
+RELATION_FIELDS = {
+    Recipe.tags.through: 'tags',
+    Recipe.ingredients.through: 'ingredients',
+}
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_relation_change(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    """ Mark recipes as modified when relations are added or removed """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).touch()
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Recipe.objects.filter(pk__in=pk_set).touch()
+    elif action == 'pre_clear':
+        # The cleared recipes can only be found before the links are gone
+        instance._cleared_recipe_ids = _linked_recipe_ids(
+            RELATION_FIELDS[sender],
+            instance,
+        )
+    elif action == 'post_clear':
+        Recipe.objects.filter(pk__in=instance._cleared_recipe_ids).touch()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_on_named_object_change(sender, instance, created,
+                                         **kwargs):
+    """ Mark recipes as modified when their tags or ingredients change """
+    if not created:
+        relation = 'tags' if sender is Tag else 'ingredients'
+        Recipe.objects.filter(**{relation: instance}).touch()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_recipes_on_named_object_delete(sender, instance, **kwargs):
+    """ Remember the recipes of a tag or ingredient being deleted """
+    relation = 'tags' if sender is Tag else 'ingredients'
+    instance._deleted_recipe_ids = _linked_recipe_ids(relation, instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def touch_recipes_on_named_object_delete(sender, instance, **kwargs):
+    """ Mark recipes as modified once their tag or ingredient is deleted """
+    Recipe.objects.filter(pk__in=instance._deleted_recipe_ids).touch()
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector(sender, instance, update_fields, **kwargs):
+    """ Refresh the search vector of a recipe when its text changes """
+    if update_fields is None or {'title', 'description'} & update_fields:
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relation_changes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """ Keep the recipe counts of tags and ingredients up to date """
+    relation = RELATION_FIELDS[sender]
+    stats = STATS_MODELS[relation].objects
+    column = Recipe._meta.get_field(relation).m2m_reverse_name()
+    if action == 'post_add' and pk_set:
+        # Only the links that did not exist yet are in pk_set
+        if reverse:
+            stats.add({instance.pk: {'recipe_count': len(pk_set)}})
+        else:
+            stats.add({pk: {'recipe_count': 1} for pk in pk_set})
+    elif action in ('pre_remove', 'pre_clear'):
+        # Removed ids may not be linked, so count the existing links
+        owner, other = (column, 'recipe_id') if reverse else (
+            'recipe_id',
+            column,
+        )
+        links = sender.objects.filter(**{owner: instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{other}__in': pk_set})
+        counts = links.values(column).annotate(count=Count('id'))
+        stats.add({
+            row[column]: {'recipe_count': -row['count']}
+            for row in counts
+        }, create=False)
+
+
+@receiver(pre_save, sender=Recipe)
+def collect_recipe_totals(sender, instance, update_fields, **kwargs):
+    """ Remember the counted values of a recipe being updated """
+    counted = {'price', 'time_minutes'}
+    if not instance._state.adding and (
+        update_fields is None or counted & set(update_fields)
+    ):
+        instance._counted_values = Recipe.objects.filter(
+            pk=instance.pk,
+        ).values(*counted).first()
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe_totals(sender, instance, created, **kwargs):
+    """ Keep the recipe totals of the user of a recipe up to date """
+    old = instance.__dict__.pop('_counted_values', None)
+    if created:
+        old = {'price': 0, 'time_minutes': 0}
+    elif old is None:
+        return
+    RecipeStats.objects.add({instance.user_id: {
+        'recipe_count': int(created),
+        'price_total': Decimal(str(instance.price)) - old['price'],
+        'time_minutes_total': int(instance.time_minutes)
+        - old['time_minutes'],
+    }}, create=created)
+
+
+@receiver(pre_delete, sender=Recipe)
+def uncount_recipe(sender, instance, **kwargs):
+    """ Remove a recipe being deleted from the stats while it is linked """
+    Recipe.objects.filter(pk=instance.pk).add_to_stats(-1)
+
+
+def _linked_recipe_ids(relation, instance):
+    """ Return the ids of the recipes linked to a tag or ingredient """
+    return list(Recipe.objects.filter(
+        **{relation: instance}
+    ).values_list('pk', flat=True))
@@ -0,0 +1,223 @@
+"""
+Tests for serving the APIs through the ASGI application
+"""
+import asyncio
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.asgi import get_asgi_application
+from core.models import Recipe, Tag
+from recipe import bulk
+from user.authentication import CachingTokenAuthentication
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+BULK_URL = reverse('recipe:recipe-bulk-import')
+
+
+async def asgi_call(method, path, body=b'', query_string='', headers=None):
+    """ Send a request through the ASGI application
+
+    Returns the status, headers and body of the response.
+    """
+    application = get_asgi_application()
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-length', str(len(body)).encode()),
+        ] + [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+
+    start = messages[0]
+    headers = {
+        name.decode().lower(): value.decode()
+        for name, value in start['headers']
+    }
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+
+    return start['status'], headers, content
+
+
+def asgi_request(*args, **kwargs):
+    """ Send a request through the ASGI application in an event loop
+
+    The loop runs like under an ASGI server, not in a sync thread the
+    sync code of the application would default to.
+    """
+    return asyncio.run(asgi_call(*args, **kwargs))
+
+
+@patch.dict(connections.databases['default'], {'CONN_MAX_AGE': 0})
+class ASGIHandlerTests(TransactionTestCase):
+    """ Test requests served by the ASGI application """
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['token_auth'].clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        token = Token.objects.create(user=self.user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+
+    def test_requests_run_in_threads_of_their_own(self):
+        """ Test a request blocked in sync code does not hold up others """
+        threads = set()
+        authenticate = CachingTokenAuthentication.authenticate
+
+        def slow_authenticate(authentication, request):
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+            return authenticate(authentication, request)
+
+        async def send_requests():
+            return await asyncio.gather(*(
+                asgi_call('GET', RECIPES_URL, headers=self.headers)
+                for _ in range(4)
+            ))
+
+        start = time.perf_counter()
+        with patch.object(
+            CachingTokenAuthentication,
+            'authenticate',
+            slow_authenticate,
+        ):
+            responses = asyncio.run(send_requests())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([status for status, *_ in responses], [200] * 4)
+        self.assertEqual(len(threads), 4)
+        self.assertLess(elapsed, 0.6)
+
+    def test_export(self):
+        """ Test exporting recipes through the ASGI application """
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=5,
+            price=Decimal('1.50'),
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+
+        status, headers, content = asgi_request(
+            'GET',
+            EXPORT_URL,
+            headers=self.headers,
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry')
+        self.assertEqual(rows[0]['tags'][0]['name'], 'Spicy')
+
+    def test_bulk_import(self):
+        """ Test importing recipes through the ASGI application """
+        body = ''.join(
+            json.dumps({
+                'title': f'Recipe {i}',
+                'time_minutes': 5,
+                'price': '1.50',
+            }) + '\n'
+            for i in range(3)
+        )
+
+        status, headers, content = asgi_request(
+            'POST',
+            BULK_URL,
+            body=body.encode(),
+            headers={
+                **self.headers,
+                'Content-Type': 'application/x-ndjson',
+            },
+        )
+
+        self.assertEqual(status, 200)
+        lines = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            lines[-1],
+            {'status': 'done', 'created': 3, 'errors': 0},
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    @patch('recipe.bulk.IMPORT_CHUNK_SIZE', 1)
+    def test_bulk_import_failure(self):
+        """ Test import failures reach the client under ASGI """
+        body = ''.join(
+            json.dumps({
+                'title': f'Recipe {i}',
+                'time_minutes': 5,
+                'price': '1.50',
+            }) + '\n'
+            for i in range(3)
+        ).encode()
+        headers = {**self.headers, 'Content-Type': 'application/x-ndjson'}
+        create_recipes = bulk.create_recipes
+
+        def fail_after(created):
+            def create(user, rows):
+                if Recipe.objects.filter(user=user).count() >= created:
+                    raise RuntimeError('Database unavailable')
+                return create_recipes(user, rows)
+            return create
+
+        with patch('recipe.bulk.create_recipes', fail_after(0)):
+            status, headers_, content = asgi_request(
+                'POST',
+                BULK_URL,
+                body=body,
+                headers=headers,
+            )
+        self.assertEqual(status, 500)
+
+        with patch('recipe.bulk.create_recipes', fail_after(1)):
+            with self.assertLogs('recipe.bulk', 'ERROR'):
+                status, headers_, content = asgi_request(
+                    'POST',
+                    BULK_URL,
+                    body=body,
+                    headers=headers,
+                )
+        self.assertEqual(status, 200)
+        lines = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [(line.get('line'), line['status']) for line in lines],
+            [(1, 'created'), (None, 'failed')],
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
@@ -0,0 +1,52 @@
+"""
+Tests for the database backend
+"""
+from django.db import connection
+from django.test import SimpleTestCase
+
+from core import metrics
+
+
+class HealthCheckTests(SimpleTestCase):
+    """ Test checking out persistent connections """
+
+    databases = ['default']
+
+    def setUp(self):
+        for counter in metrics.COUNTERS:
+            counter.clear()
+        connection.ensure_connection()
+        # Start a new request with the open connection
+        connection.close_if_unusable_or_obsolete()
+
+    def test_checkout_counted_once_per_request(self):
+        """ Test the first use of a connection in a request is counted """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.execute('SELECT 1')
+
+        self.assertEqual(
+            metrics.DB_CHECKOUTS.value(alias='default', reused='true'),
+            1,
+        )
+        self.assertIn(
+            'db_connection_checkouts_total{alias="default",reused="true"} 1',
+            metrics.render_prometheus(),
+        )
+
+    def test_dropped_connection_reopened(self):
+        """ Test a connection closed behind Django's back is replaced """
+        connection.connection.close()
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        self.assertEqual(
+            metrics.DB_HEALTH_CHECK_FAILURES.value(alias='default'),
+            1,
+        )
+        self.assertEqual(
+            metrics.DB_CHECKOUTS.value(alias='default', reused='false'),
+            1,
+        )
@@ -0,0 +1,179 @@
+"""
+Tests for the request instrumentation
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+METRICS_URL = reverse('metrics')
+
+
+class MetricsMiddlewareTests(TestCase):
+    """ Test measuring requests """
+
+    def setUp(self):
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """ Test responses report their query count and timings """
+        Recipe.objects.create(
+            user=self.user,
+            title='Recipe',
+            time_minutes=5,
+            price='1.00',
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn('serializer;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """ Test the Server-Timing header can be turned off """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_streaming_response_queries_counted(self):
+        """ Test queries made while streaming the body are recorded """
+        Recipe.objects.create(
+            user=self.user,
+            title='Recipe',
+            time_minutes=5,
+            price='1.00',
+        )
+
+        res = self.client.get(EXPORT_URL)
+        series = 'view="recipe:recipe-export",action="export"'
+        self.assertNotIn(series, '\n'.join(metrics.REQUEST_QUERIES.render()))
+
+        b''.join(res.streaming_content)
+
+        lines = metrics.REQUEST_QUERIES.render()
+        self.assertIn(f'http_request_db_queries_count{{{series}}} 1', lines)
+        queries = float(next(
+            line.split()[-1]
+            for line in lines
+            if line.startswith(f'http_request_db_queries_sum{{{series}}}')
+        ))
+        self.assertGreater(queries, 0)
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        """ Test the histograms are exposed per view and action """
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(
+            'http_request_duration_seconds_count{view="recipe:recipe-list",'
+            'action="list",method="GET",status="200"} 2',
+            body,
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{view="recipe:recipe-list",'
+            'action="list",le="1"} 2',
+            body,
+        )
+
+    def test_metrics_endpoint_disabled_without_token(self):
+        """ Test the metrics endpoint is hidden without a token """
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_token(self):
+        """ Test the metrics endpoint requires the configured token """
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, 403)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_request_logged(self):
+        """ Test slow requests are logged """
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertIn(f'Slow request GET {RECIPES_URL}', logs.output[0])
+
+
+class RequestMetricsTests(SimpleTestCase):
+    """ Test collecting the measures of a request """
+
+    databases = ['default']
+
+    def test_repeated_statements(self):
+        """ Test statements executed several times are reported """
+        metrics.install(connection=connection)
+        with metrics.collect() as measures:
+            with connection.cursor() as cursor:
+                for value in range(3):
+                    cursor.execute('SELECT %s', [value])
+                cursor.execute('SELECT 1')
+
+        self.assertEqual(measures.queries, 4)
+        self.assertEqual(
+            measures.repeated_statements(5),
+            [('SELECT %s', 3)],
+        )
+
+    def test_timer(self):
+        """ Test timers add up in the current request only """
+        with metrics.timer('serializer'):
+            pass
+        with metrics.collect() as measures:
+            with metrics.timer('serializer'):
+                pass
+            with metrics.timer('serializer'):
+                pass
+
+        self.assertGreater(measures.timings['serializer'], 0)
+
+
+class HistogramTests(SimpleTestCase):
+    """ Test the Prometheus histograms """
+
+    def test_render(self):
+        """ Test rendering cumulative buckets """
+        histogram = metrics.Histogram('test', 'Test.', ('view',), (1, 5))
+        histogram.observe(0.5, view='a')
+        histogram.observe(3, view='a')
+        histogram.observe(7, view='a')
+
+        self.assertEqual(histogram.render(), [
+            '# HELP test Test.',
+            '# TYPE test histogram',
+            'test_bucket{view="a",le="1"} 1',
+            'test_bucket{view="a",le="5"} 2',
+            'test_bucket{view="a",le="+Inf"} 3',
+            'test_sum{view="a"} 10.5',
+            'test_count{view="a"} 3',
+        ])
@@ -103,3 +103,44 @@ class ModelTest(TestCase):
         file_path = models.recipe_image_file_path(None, 'example.jpg')
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+
+    def test_get_or_create_tags_by_names(self):
+        """ Test existing tags are reused and missing ones created """
+        user = create_user()
+        existing = models.Tag.objects.create(user=user, name='Vegan')
+
+        tags = models.Tag.objects.get_or_create_by_names(
+            user,
+            ['Quick', 'Vegan', 'Quick'],
+        )
+
+        self.assertEqual([tag.name for tag in tags], ['Quick', 'Vegan'])
+        self.assertEqual(tags[1], existing)
+        self.assertIsNotNone(tags[0].pk)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_recipe_relation_ids_follow_links(self):
+        """ Test the tag and ingredient ids of a recipe stay in sync """
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Recipe',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        tag1 = models.Tag.objects.create(user=user, name='Vegan')
+        tag2 = models.Tag.objects.create(user=user, name='Quick')
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+
+        recipe.tags.add(tag2, tag1)
+        tag1.recipe_set.add(recipe)
+        recipe.ingredients.add(ingredient)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tag_ids, [tag1.id, tag2.id])
+        self.assertEqual(recipe.ingredient_ids, [ingredient.id])
+
+        tag1.delete()
+        ingredient.recipe_set.clear()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tag_ids, [tag2.id])
+        self.assertEqual(recipe.ingredient_ids, [])
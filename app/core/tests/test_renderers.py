@@ -0,0 +1,149 @@
+"""
+Tests for the shared renderers and parsers
+"""
+import io
+import json
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+SAMPLE = OrderedDict([
+    ('id', 1),
+    ('title', 'Crème brûlée \u2028 \u2029'),
+    ('price', '10.50'),
+    ('ratio', 0.25),
+    ('missing', None),
+    ('tags', [{'id': 2, 'name': 'Dessert'}]),
+    ('created', datetime(2021, 5, 4, 3, 2, 1, 123456, tzinfo=timezone.utc)),
+    ('uuid', uuid.UUID(int=1)),
+    ('label', gettext_lazy('Name')),
+    ('counts', {1: 2}),
+])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """ Test the orjson backed renderer """
+
+    def test_render_like_drf(self):
+        """ Test rendering produces the bytes of the DRF renderer """
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE),
+        )
+
+    def test_render_escapes_line_terminators(self):
+        """ Test line and paragraph separators are escaped """
+        rendered = FastJSONRenderer().render({'text': '\u2028\u2029'})
+
+        self.assertEqual(rendered, b'{"text":"\\u2028\\u2029"}')
+
+    def assertRendersLikeDRF(self, data):
+        """ Assert data renders to the bytes or error of the DRF renderer """
+        try:
+            expected = JSONRenderer().render(data)
+        except ValueError as exc:
+            with self.assertRaisesMessage(ValueError, str(exc)):
+                FastJSONRenderer().render(data)
+        else:
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_render_decimal_like_drf(self):
+        """ Test decimals are encoded like the DRF renderer """
+        self.assertRendersLikeDRF({'price': Decimal('10.10')})
+
+    def test_render_big_integers_like_drf(self):
+        """ Test integers orjson cannot encode fall back to DRF """
+        self.assertRendersLikeDRF({'id': 2 ** 64, 'ids': [-2 ** 70]})
+
+    def test_render_non_finite_floats_like_drf(self):
+        """ Test NaN and infinite floats are refused like DRF """
+        for value in [float('nan'), float('inf'), -float('inf')]:
+            self.assertRendersLikeDRF({'missing': None, 'ratio': value})
+            self.assertRendersLikeDRF([{'scores': [0.5, value]}])
+
+    def test_render_floats_equivalent_to_drf(self):
+        """ Test floats encode to the values of the DRF renderer """
+        data = {'scores': [1e16, 1.5e-7, 0.1, 123456789.125]}
+
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+    def test_render_non_finite_floats_not_strict(self):
+        """ Test NaN is written as is when strict JSON is off """
+        data = {'ratio': float('nan'), 'missing': None}
+
+        with patch.object(JSONRenderer, 'strict', False):
+            self.assertEqual(
+                FastJSONRenderer().render(data),
+                JSONRenderer().render(data),
+            )
+
+    def test_render_indented_with_drf(self):
+        """ Test indented output is rendered like the DRF renderer """
+        context = {'indent': 4}
+
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, renderer_context=context),
+            JSONRenderer().render(SAMPLE, renderer_context=context),
+        )
+
+    def test_render_without_orjson(self):
+        """ Test rendering falls back to the DRF renderer """
+        with patch('core.renderers.orjson', None):
+            rendered = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(rendered, JSONRenderer().render(SAMPLE))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """ Test the orjson backed parser """
+
+    def parse(self, body, **context):
+        """ Parse a JSON body """
+        return FastJSONParser().parse(
+            io.BytesIO(body),
+            parser_context=context,
+        )
+
+    def test_parse_like_drf(self):
+        """ Test parsing returns the data of the DRF parser """
+        body = '{"title": "Crème", "price": 1.5, "tags": [{"name": "a"}]}'
+
+        self.assertEqual(
+            self.parse(body.encode()),
+            JSONParser().parse(io.BytesIO(body.encode())),
+        )
+
+    def test_parse_invalid_error(self):
+        """ Test invalid and non strict JSON raises a parse error """
+        for body in [b'{"title": ', b'{"price": NaN}']:
+            with self.assertRaises(ParseError):
+                self.parse(body)
+
+    def test_parse_other_encoding(self):
+        """ Test bodies not encoded as UTF-8 are decoded first """
+        body = '{"title": "Crème"}'.encode('latin-1')
+
+        self.assertEqual(
+            self.parse(body, encoding='latin-1'),
+            {'title': 'Crème'},
+        )
+
+    def test_parse_without_orjson(self):
+        """ Test parsing falls back to the DRF parser """
+        with patch('core.parsers.orjson', None):
+            self.assertEqual(self.parse(b'{"id": 1}'), {'id': 1})
@@ -0,0 +1,44 @@
+"""
+Tests for the database router
+"""
+from django.test import SimpleTestCase, override_settings
+
+from core import routers
+from core.models import Recipe
+
+
+@override_settings(DATABASE_REPLICAS=['replica0', 'replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    """ Test routing reads to the replicas """
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_outside_requests_use_primary(self):
+        """ Test reads default to the primary """
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+        with routers.replica_reads():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_balanced_over_replicas(self):
+        """ Test each request reads from one of the replicas """
+        aliases = set()
+        for _ in range(50):
+            with routers.replica_reads():
+                routers.route_reads(user_id=1)
+                alias = self.router.db_for_read(Recipe)
+                self.assertEqual(self.router.db_for_read(Recipe), alias)
+                aliases.add(alias)
+
+        self.assertEqual(aliases, {'replica0', 'replica1'})
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_writes_and_migrations_use_primary(self):
+        """ Test writes and schema changes go to the primary """
+        with routers.replica_reads():
+            routers.route_reads(user_id=1)
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica0', 'core'))
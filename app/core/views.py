@@ -0,0 +1,30 @@
+"""
+Views shared by the APIs
+"""
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core import metrics
+
+
+def metrics_view(request):
+    """ Expose the request histograms in the Prometheus text format
+
+    Histograms are kept per process, so every worker is scraped on its
+    own. METRICS_TOKEN is required as a bearer token, and the endpoint
+    is only open without it in DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise Http404
+    if token and not constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {token}',
+    ):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
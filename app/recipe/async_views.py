@@ -0,0 +1,131 @@
+"""
+Async request handling of the recipe APIs under ASGI
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """ Return the pool of threads database work is run in """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_WORKERS,
+                thread_name_prefix='async-db',
+            )
+
+    return _executor
+
+
+async def in_thread(func, *args, **kwargs):
+    """ Run blocking database work in a worker thread of its own
+
+    Every worker thread holds its own connection, so calls gathered
+    together run their queries concurrently, up to ASYNC_DB_WORKERS at
+    a time in the process. They are not a snapshot:
+    each query sees the data committed when it starts, so a change
+    committed between two of them shows in the results of one only.
+    The connection is released like at the end of a request once the
+    work is done, ending its checkout: it is closed with CONN_MAX_AGE 0,
+    the default under ASGI, or health checked on the next use.
+    """
+    def run():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(
+        run,
+        thread_sensitive=False,
+        executor=_get_executor(),
+    )()
+
+
+async def gather_in_threads(*calls):
+    """ Run (func, *args) calls concurrently, returning their results """
+    return await asyncio.gather(*(in_thread(*call) for call in calls))
+
+
+class AsyncViewSetMixin:
+    """ Serve the async actions of a viewset from coroutines
+
+    With the ASYNC_VIEWS setting on, as under ASGI, the views of the
+    viewset are coroutines. The actions listed in async_actions are
+    handled by the a<action> coroutine method, which awaits the database
+    instead of holding a thread for the whole request. Other actions run
+    their usual handler in a thread.
+    """
+    async_actions = []
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        """ Return an async view when the ASYNC_VIEWS setting is on """
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_VIEWS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            action = actions.get(request.method.lower())
+            if action not in cls.async_actions:
+                return await sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, name in actions.items():
+                setattr(self, method, getattr(self, name))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Routers, schemas, metrics and CSRF read the attributes of views
+        async_view.__dict__.update(view.__dict__)
+        async_view.__doc__ = view.__doc__
+
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """ Async counterpart of APIView.dispatch for the async actions """
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication and permissions may query the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            # Handlers and finalizers may log or use caches, so they do
+            # not run on the event loop either
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = await sync_to_async(self.finalize_response)(
+            request,
+            response,
+            *args,
+            **kwargs,
+        )
+
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        """ List objects from a thread, they are read in one query """
+        return await sync_to_async(self.list)(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """ Retrieve an object and its prefetched relations from a thread """
+        return await sync_to_async(self.retrieve)(request, *args, **kwargs)
@@ -0,0 +1,232 @@
+"""
+Benchmarks of the recipe APIs
+"""
+import io
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from recipe import listing, seed
+from recipe.serializers import RecipeSerializer
+
+
+BENCHMARKS = {}
+
+
+def register(name):
+    """ Register a benchmark function under a name
+
+    Benchmarks are called with the parsed command options and return a
+    dict mapping case names to the measures of profile().
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def measure(func, repeat):
+    """ Return the timings in seconds of repeated calls of func """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def profile(func, repeat):
+    """ Return the timings, queries and peak allocation of func
+
+    Queries and allocations are measured on extra calls, so tracing does
+    not slow down the timed ones.
+    """
+    timings = measure(func, repeat)
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    # Requests reset the query log, so queries are counted as executed
+    with connection.execute_wrapper(record):
+        func()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'timings': timings, 'queries': len(queries), 'peak_bytes': peak}
+
+
+def summarize(result):
+    """ Return the statistics of a profile, timings in milliseconds """
+    timings = result['timings']
+    return {
+        'min_ms': min(timings) * 1000,
+        'median_ms': statistics.median(timings) * 1000,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'max_ms': max(timings) * 1000,
+        'queries': result['queries'],
+        'peak_bytes': result['peak_bytes'],
+    }
+
+
+def create_user(options):
+    """ Create the user and recipes a benchmark runs on
+
+    The address is unique, so databases already holding users, e.g. a
+    seeded development database, do not get in the way.
+    """
+    user = get_user_model().objects.create_user(
+        f'benchmark-{uuid.uuid4().hex}@example.com',
+        'password',
+    )
+    seed.create_recipes(
+        user,
+        options['size'],
+        options['fanout'],
+        random.Random(options['seed']),
+    )
+
+    return user
+
+
+@register('list-rendering')
+def list_rendering(options):
+    """ Compare rendering a recipe page with the serializer and from rows """
+    user = create_user(options)
+    queryset = Recipe.objects.filter(user=user).order_by('-id')
+    renderer = JSONRenderer()
+
+    def with_serializer():
+        recipes = queryset.prefetch_related(*[
+            Prefetch(relation, queryset=model.objects.order_by('id'))
+            for relation, model in (('tags', Tag), ('ingredients', Ingredient))
+        ])
+        return renderer.render(RecipeSerializer(recipes, many=True).data)
+
+    def from_rows():
+        rows = listing.RowSerializer(RecipeSerializer(context={}))
+        return renderer.render(
+            rows.to_representation(list(queryset.values(*rows.columns)))
+        )
+
+    if with_serializer() != from_rows():
+        raise AssertionError('Rendered recipe lists differ')
+
+    return {
+        'serializer': profile(with_serializer, options['repeat']),
+        'rows': profile(from_rows, options['repeat']),
+    }
+
+
+@register('json')
+def json_rendering(options):
+    """ Compare the DRF and orjson backed JSON renderers and parsers """
+    user = create_user(options)
+    rows = listing.RowSerializer(RecipeSerializer(context={}))
+    data = rows.to_representation(list(
+        Recipe.objects.filter(user=user).values(*rows.columns)
+    ))
+    body = JSONRenderer().render(data)
+    if FastJSONRenderer().render(data) != body:
+        raise AssertionError('Rendered JSON differs')
+
+    return {
+        'render drf': profile(
+            lambda: JSONRenderer().render(data),
+            options['repeat'],
+        ),
+        'render fast': profile(
+            lambda: FastJSONRenderer().render(data),
+            options['repeat'],
+        ),
+        'parse drf': profile(
+            lambda: JSONParser().parse(io.BytesIO(body)),
+            options['repeat'],
+        ),
+        'parse fast': profile(
+            lambda: FastJSONParser().parse(io.BytesIO(body)),
+            options['repeat'],
+        ),
+    }
+
+
+@register('api')
+def api(options):
+    """ Measure the recipe endpoints end to end """
+    user = create_user(options)
+    client = APIClient()
+    client.force_authenticate(user)
+    recipe = Recipe.objects.filter(user=user).order_by('id').first()
+    tag = recipe.tags.order_by('id').first()
+    ingredient = recipe.ingredients.order_by('id').first()
+    list_url = reverse('recipe:recipe-list')
+    detail_url = reverse('recipe:recipe-detail', args=[recipe.id])
+    payload = {
+        'title': 'Benchmark curry',
+        'time_minutes': 30,
+        'price': '12.50',
+        'tags': [{'name': 'Dinner'}, {'name': 'Spicy'}],
+        'ingredients': [{'name': 'Rice'}, {'name': 'Coconut milk'}],
+    }
+
+    def call(method, url, expected=status.HTTP_200_OK, **kwargs):
+        """ Return a function requesting url and checking the status """
+        def request():
+            res = getattr(client, method)(url, **kwargs)
+            if res.status_code != expected:
+                raise AssertionError(
+                    f'{method.upper()} {url} returned {res.status_code}'
+                )
+        return request
+
+    cases = {
+        'list': call('get', list_url, data={'page_size': 100}),
+        'filter': call('get', list_url, data={
+            'tags': tag.id,
+            'ingredients': ingredient.id,
+            'page_size': 100,
+        }),
+        'detail': call('get', detail_url),
+        'create': call(
+            'post',
+            list_url,
+            expected=status.HTTP_201_CREATED,
+            data=payload,
+            format='json',
+        ),
+        'update': call('patch', detail_url, data=payload, format='json'),
+    }
+
+    # The test client requests the host the test runner allows. Data is
+    # created in a transaction rolled back afterwards, which the replicas
+    # never see, so every request reads from the primary.
+    with override_settings(
+        ALLOWED_HOSTS=['testserver'],
+        DATABASE_REPLICAS=[],
+    ):
+        return {
+            name: profile(request, options['repeat'])
+            for name, request in cases.items()
+        }
@@ -0,0 +1,386 @@
+"""
+Bulk operations for the recipe APIs
+"""
+import logging
+import uuid
+from itertools import islice
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ParseError
+
+from core.models import (
+    ImageJob,
+    Recipe,
+    RecipeStats,
+    Tag,
+    Ingredient,
+    STATS_MODELS)
+from core import routers
+from recipe import listing
+from recipe.cache import bump_version
+from recipe.serializers import RecipeImportSerializer
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = [
+    'id',
+    'title',
+    'description',
+    'time_minutes',
+    'price',
+    'link',
+]
+RELATIONS = {'tags': Tag, 'ingredients': Ingredient}
+# Fields whose changes are copied into the recipe search vectors
+SEARCHED_FIELDS = {'title', 'description'}
+
+
+def chunked(iterable, size):
+    """ Yield lists of at most size items from iterable """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_recipes(rows, context, chunk_size=None):
+    """ Validate and create recipes from (line, data) rows
+
+    Rows are consumed chunk by chunk and every chunk is written in one
+    transaction, so memory use does not depend on the number of rows.
+    Yields one list of per row results for every chunk, then a status
+    without line: 'done', or 'failed' when an error stopped the import
+    after a chunk was yielded. The results already sent were committed,
+    the rows after them were not imported. Errors of the first chunk
+    are raised, nothing was sent or written yet.
+
+    The chunks after the first are written while the response streams,
+    after the view pinned the user to the primary, so every chunk
+    creating recipes pins the user again.
+    """
+    user = context['request'].user
+    counts = {'created': 0, 'errors': 0}
+    started = False
+    try:
+        for chunk in chunked(rows, chunk_size or IMPORT_CHUNK_SIZE):
+            results = _import_chunk(user, chunk, context)
+            for result in results:
+                if result['status'] == 'created':
+                    counts['created'] += 1
+                else:
+                    counts['errors'] += 1
+            if any(result['status'] == 'created' for result in results):
+                routers.pin_to_primary(user.id)
+            started = True
+            yield results
+    except Exception:
+        if not started:
+            raise
+        logger.exception('Recipe import of user %s failed', user.id)
+        yield [{
+            'status': 'failed',
+            **counts,
+            'detail': _('The import failed, rows without result were not '
+                        'imported'),
+        }]
+    else:
+        yield [{'status': 'done', **counts}]
+
+
+def _import_chunk(user, chunk, context):
+    """ Create the valid rows of a chunk returning the per row results """
+    results = []
+    valid = []
+    for line, data in chunk:
+        fields, errors = _validate_row(data, context)
+        if errors:
+            results.append({
+                'line': line,
+                'status': 'error',
+                'errors': errors,
+            })
+        else:
+            valid.append((line, fields))
+
+    recipes = create_recipes(user, [fields for line, fields in valid])
+    for (line, fields), recipe in zip(valid, recipes):
+        results.append({
+            'line': line,
+            'status': 'created',
+            'id': recipe.id,
+        })
+
+    return sorted(results, key=lambda result: result['line'])
+
+
+def _validate_row(data, context):
+    """ Validate a row returning its fields and its errors """
+    if isinstance(data, ParseError):
+        return None, {'non_field_errors': [data.detail]}
+    if not isinstance(data, dict):
+        return None, {'non_field_errors': [_('Expected a JSON object')]}
+
+    serializer = RecipeImportSerializer(data=data, context=context)
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    return serializer.validated_data, None
+
+
+def create_recipes(user, rows):
+    """ Create recipes with their tags and ingredients in bulk
+
+    Rows hold the recipe fields, with tags and ingredients as lists of
+    {'name': name} dicts. Bulk inserts send no signals, so the derived
+    data, stats and cached responses are updated here.
+    """
+    if not rows:
+        return []
+
+    related = {}
+    recipes = []
+    for fields in rows:
+        fields = dict(fields)
+        for relation in RELATIONS:
+            related.setdefault(relation, []).append(
+                [item['name'] for item in fields.pop(relation, [])]
+            )
+        recipes.append(Recipe(user=user, **fields))
+
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create(recipes)
+        for relation, model in RELATIONS.items():
+            names = [name for names in related[relation] for name in names]
+            objects = {
+                obj.name: obj
+                for obj in model.objects.get_or_create_by_names(user, names)
+            }
+            through = getattr(Recipe, relation).through
+            column = f'{model._meta.model_name}_id'
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, **{column: objects[name].id})
+                for recipe, names in zip(recipes, related[relation])
+                for name in dict.fromkeys(names)
+            ])
+        created = Recipe.objects.filter(
+            pk__in=[recipe.id for recipe in recipes],
+        )
+        created.refresh_derived()
+        created.add_to_stats()
+        bump_version(user.id)
+
+    return recipes
+
+
+def _changed_fields(changes):
+    """ Return the fields set by {pk: {field: value}} changes """
+    return sorted({field for values in changes.values() for field in values})
+
+
+def _relation_of(model):
+    """ Return the recipe relation of tags or ingredients """
+    return next(
+        relation
+        for relation, related in RELATIONS.items()
+        if related is model
+    )
+
+
+def update_recipes(user, changes):
+    """ Apply {pk: {field: value}} changes to recipes of a user
+
+    Recipes are written in one UPDATE, which sends no signals, so the
+    modification time, search vectors, stats and cached responses are
+    updated here. Returns the ids of the updated recipes.
+    """
+    fields = _changed_fields(changes)
+    with transaction.atomic():
+        recipes = list(Recipe.objects.select_for_update().filter(
+            user=user,
+            pk__in=changes,
+        ).only('id', 'price', 'time_minutes', *fields))
+        if not recipes:
+            return []
+
+        now = timezone.now()
+        price_total = time_minutes_total = 0
+        for recipe in recipes:
+            price_total -= recipe.price
+            time_minutes_total -= recipe.time_minutes
+            for field, value in changes[recipe.pk].items():
+                setattr(recipe, field, value)
+            recipe.updated_at = now
+            price_total += recipe.price
+            time_minutes_total += recipe.time_minutes
+        Recipe.objects.bulk_update(recipes, [*fields, 'updated_at'])
+
+        ids = [recipe.pk for recipe in recipes]
+        if SEARCHED_FIELDS & set(fields):
+            Recipe.objects.filter(pk__in=ids).update_search_vector()
+        RecipeStats.objects.add({user.id: {
+            'recipe_count': 0,
+            'price_total': price_total,
+            'time_minutes_total': time_minutes_total,
+        }}, create=False)
+        bump_version(user.id)
+
+    return ids
+
+
+def update_named_objects(model, user, changes):
+    """ Apply {pk: {field: value}} changes to tags or ingredients of a user
+
+    Objects are written in one UPDATE and their recipes touched in
+    another. Renamed objects first move to unique temporary names, as
+    the unique names are checked row by row and swapping names would
+    otherwise conflict. Names taken by other objects raise an
+    IntegrityError. Returns the ids of the updated objects.
+    """
+    fields = _changed_fields(changes)
+    with transaction.atomic():
+        objects = list(model.objects.select_for_update().filter(
+            user=user,
+            pk__in=changes,
+        ))
+        for obj in objects:
+            for field, value in changes[obj.pk].items():
+                setattr(obj, field, value)
+        ids = [obj.pk for obj in objects]
+        if not ids or not fields:
+            return ids
+
+        if 'name' in fields:
+            model.objects.bulk_update([
+                model(pk=obj.pk, name=uuid.uuid4().hex) for obj in objects
+            ], ['name'])
+        model.objects.bulk_update(objects, fields)
+        Recipe.objects.filter(**{f'{_relation_of(model)}__in': ids}).touch()
+        bump_version(user.id)
+
+    return ids
+
+
+def _delete_rows(model, pks, cleared):
+    """ Delete rows by pk with one DELETE, sending no signals
+
+    Unlike QuerySet.delete(), no object is loaded and nothing cascades,
+    so the rows of every model relating to model must be deleted first
+    and the model listed in cleared. Relations added later raise here
+    instead of failing on their foreign key or leaving orphan rows.
+    """
+    meta = model._meta
+    related = {
+        field.related_model
+        for field in meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete
+        and (field.one_to_many or field.one_to_one)
+    }
+    uncleared = related - set(cleared)
+    if uncleared:
+        raise RuntimeError(
+            f'Rows relating to {meta.label} are not cleared: '
+            + ', '.join(sorted(other._meta.label for other in uncleared))
+        )
+
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.pk.column)} = ANY(%s)',
+            [list(pks)],
+        )
+        return cursor.rowcount
+
+
+def delete_recipes(user, ids):
+    """ Delete recipes of a user with their links and image jobs
+
+    Every table is cleared with one DELETE, and the recipes are removed
+    from the stats first as model deletion would. Returns the ids of the
+    deleted recipes and the number of tag and ingredient links removed.
+    """
+    with transaction.atomic():
+        found = list(Recipe.objects.select_for_update().filter(
+            user=user,
+            pk__in=ids,
+        ).values_list('pk', flat=True))
+        if not found:
+            return [], 0
+
+        Recipe.objects.filter(pk__in=found).add_to_stats(-1)
+        detached = 0
+        cleared = [ImageJob]
+        for relation in RELATIONS:
+            through = getattr(Recipe, relation).through
+            detached += through.objects.filter(
+                recipe_id__in=found,
+            ).delete()[0]
+            cleared.append(through)
+        ImageJob.objects.filter(recipe_id__in=found).delete()
+        # The signal work of recipe deletion is done above, so the rows
+        # go without loading and signalling every recipe
+        _delete_rows(Recipe, found, cleared)
+        bump_version(user.id)
+
+    return found, detached
+
+
+def delete_named_objects(model, user, ids):
+    """ Delete tags or ingredients of a user, detaching them from recipes
+
+    The links, stats and objects are cleared with one DELETE each and
+    the recipes that lost them touched with one UPDATE. Returns the ids
+    of the deleted objects and the number of recipe links removed.
+    """
+    relation = _relation_of(model)
+    column = Recipe._meta.get_field(relation).m2m_reverse_name()
+    with transaction.atomic():
+        found = list(model.objects.select_for_update().filter(
+            user=user,
+            pk__in=ids,
+        ).values_list('pk', flat=True))
+        if not found:
+            return [], 0
+
+        links = getattr(Recipe, relation).through.objects.filter(
+            **{f'{column}__in': found}
+        )
+        recipe_ids = list(links.values_list('recipe_id', flat=True))
+        detached = links.delete()[0]
+        STATS_MODELS[relation].objects.filter(pk__in=found).delete()
+        _delete_rows(model, found, [links.model, STATS_MODELS[relation]])
+        Recipe.objects.filter(pk__in=set(recipe_ids)).touch()
+        bump_version(user.id)
+
+    return found, detached
+
+
+def export_recipes(queryset, chunk_size=None):
+    """ Yield batches of recipe dicts with tags and ingredients inlined
+
+    Recipes are read with a server side cursor and the relations of each
+    batch are fetched with one query per relation, ordered by id like the
+    API responses, so memory use does not depend on the number of recipes.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    rows = queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        ids = [row['id'] for row in chunk]
+        related = {
+            relation: listing.related_by_recipe(relation, ids)
+            for relation in RELATIONS
+        }
+        for row in chunk:
+            row['price'] = str(row['price'])
+            for relation, items in related.items():
+                row[relation] = items.get(row['id'], [])
+
+        yield chunk
@@ -0,0 +1,124 @@
+"""
+Per user response cache for the recipe APIs
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def get_cache():
+    """ Return the cache backend used by the recipe APIs """
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    """ Return the cache key holding the version of a user data """
+    return f'recipe:version:{user_id}'
+
+
+def get_version(user_id):
+    """ Return the current version of a user data """
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_version(user_id):
+    """ Invalidate every cached response of a user
+
+    Versions are random rather than incremented, so a version evicted
+    from the cache can never bring back responses cached under it. The
+    bump is repeated on commit so readers racing the transaction cannot
+    cache stale data under the new version.
+    """
+    def bump():
+        get_cache().set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_suggest_cache():
+    """ Return the in-process cache of name suggestions """
+    return caches[settings.RECIPE_SUGGEST_CACHE_ALIAS]
+
+
+def versioned_key(prefix, user_id, *parts):
+    """ Return a cache key that changes whenever the user data changes """
+    digest = hashlib.md5(':'.join([
+        get_version(user_id),
+        *[str(part) for part in parts],
+    ]).encode()).hexdigest()
+
+    return f'recipe:{prefix}:{user_id}:{digest}'
+
+
+def make_etag(request, *parts):
+    """ Return a strong ETag for the request path and the given parts """
+    digest = hashlib.md5(':'.join([
+        request.get_full_path(),
+        request.accepted_media_type or '',
+        *[str(part) for part in parts],
+    ]).encode()).hexdigest()
+
+    return f'"{digest}"'
+
+
+def is_conditional(request):
+    """ Return whether the request carries validators to check """
+    return (
+        'HTTP_IF_NONE_MATCH' in request.META
+        or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    )
+
+
+def set_validators(response, etag, last_modified=None):
+    """ Add the validators and per user caching headers to a response """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True)
+    patch_vary_headers(response, ['Authorization'])
+
+    return response
+
+
+class CachedListMixin:
+    """ Serve list responses from a per user versioned cache
+
+    Entries are keyed by user, data version and full request path and are
+    revalidated with an ETag, so an unchanged list costs no DB queries.
+    """
+
+    def list(self, request, *args, **kwargs):
+        """ Return the cached list or build and cache it """
+        version = get_version(request.user.pk)
+        etag = make_etag(request, self.basename, request.user.pk, version)
+        key = f'recipe:list:{etag.strip(chr(34))}'
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            cache = get_cache()
+            data = cache.get(key)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+                cache.set(key, data)
+            response = Response(data)
+
+        return set_validators(response, etag)
@@ -0,0 +1,140 @@
+"""
+Filters for the recipe APIs
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Recipe, RELATION_ID_FIELDS, SEARCH_CONFIG
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = [MATCH_ANY, MATCH_ALL]
+
+# Trigrams need at least this many characters to match anything
+TRIGRAM_MIN_LENGTH = 3
+
+RELATIONS = RELATION_ID_FIELDS
+
+
+def params_to_ints(value):
+    """ Convert a comma separated string of IDs to integers """
+    return [int(str_id) for str_id in value.split(',')]
+
+
+def filter_by_relations(queryset, relation_ids, match=MATCH_ANY):
+    """ Filter recipes linked to the given ids of each relation
+
+    Conditions test the arrays of related ids stored on recipes, which
+    GIN indexes serve without joining the relation tables: any matches
+    overlapping arrays, all matches arrays containing every id.
+    """
+    lookup = 'contains' if match == MATCH_ALL else 'overlap'
+    for relation, ids in relation_ids.items():
+        queryset = queryset.filter(**{
+            f'{RELATIONS[relation]}__{lookup}': list(dict.fromkeys(ids)),
+        })
+
+    return queryset
+
+
+def search(queryset, text):
+    """ Filter recipes matching a web search query, annotating their rank
+
+    Matching uses the GIN index of the stored search vectors. The rank is
+    cast to double precision so cursor positions round trip exactly.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+    )
+
+
+class TrigramWordSimilar(Func):
+    """ Whether a column contains a word sequence similar to a string,
+    served by trigram indexes
+    """
+    arg_joiner = ' %%> '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+    def __init__(self, expression, string, **extra):
+        super().__init__(expression, Value(string), **extra)
+
+
+class WordSimilarity(Func):
+    """ Similarity of a string to the closest word sequence of a column """
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+    def __init__(self, expression, string, **extra):
+        super().__init__(Value(string), expression, **extra)
+
+
+def _recipe_links(queryset):
+    """ Return the recipe links of each object of a tag or ingredient
+    queryset, served by the (object, recipe) index of the link table
+    """
+    for relation in RELATIONS:
+        field = Recipe._meta.get_field(relation)
+        if field.related_model is queryset.model:
+            column = field.m2m_reverse_name()
+            return field.remote_field.through.objects.filter(
+                **{column: OuterRef('pk')}
+            ).order_by().values(column)
+
+    raise ValueError(f'{queryset.model.__name__} is not linked to recipes')
+
+
+def assigned_only(queryset):
+    """ Filter tags or ingredients used by at least one recipe """
+    return queryset.filter(Exists(_recipe_links(queryset)))
+
+
+def with_recipe_count(queryset):
+    """ Annotate tags or ingredients with the number of their recipes """
+    counts = _recipe_links(queryset).annotate(count=Count('*'))
+
+    return queryset.annotate(
+        recipe_count=Coalesce(Subquery(counts.values('count')), 0),
+    )
+
+
+def suggest(queryset, text, limit):
+    """ Return id/name dicts of the names best completing text
+
+    Texts long enough for trigrams match prefixes and misspellings with
+    the similarity operators served by the trigram GIN index; shorter
+    texts only match prefixes. Prefix matches come first.
+    """
+    if len(text) < TRIGRAM_MIN_LENGTH:
+        queryset = queryset.filter(name__istartswith=text)
+    else:
+        queryset = queryset.filter(
+            Q(TrigramWordSimilar('name', text))
+            | Q(name__trigram_similar=text)
+        )
+
+    return list(queryset.annotate(
+        is_prefix=ExpressionWrapper(
+            Q(name__istartswith=text),
+            output_field=BooleanField(),
+        ),
+        similarity=WordSimilarity('name', text),
+    ).order_by('-is_prefix', '-similarity', 'name').values('id', 'name')[
+        :limit
+    ])
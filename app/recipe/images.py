@@ -0,0 +1,176 @@
+"""
+Background processing of uploaded recipe images
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from core.models import Recipe, ImageJob, recipe_image_file_path
+
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of every rendition
+RENDITION_SIZES = {
+    'thumbnail': 320,
+    'medium': 1024,
+}
+JPEG_QUALITY = 85
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_formats():
+    """ Return the (format, extension) pairs renditions are saved in """
+    formats = [('jpeg', 'jpg')]
+    if features.check('webp'):
+        formats.insert(0, ('webp', 'webp'))
+
+    return formats
+
+
+def enqueue(recipe):
+    """ Queue the processing of the current image of a recipe """
+    _delete_renditions(recipe)
+    recipe.image_renditions = {}
+    Recipe.objects.filter(pk=recipe.pk).update(image_renditions={})
+    job = ImageJob.objects.create(recipe=recipe, image=recipe.image.name)
+    transaction.on_commit(lambda: submit(job.pk))
+
+    return job
+
+
+def submit(job_id):
+    """ Process a job in the worker pool, or inline without workers """
+    workers = settings.IMAGE_PROCESSING_WORKERS
+    if not workers:
+        process_job(job_id)
+        return
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='recipe-images',
+            )
+    _executor.submit(_run_in_worker, job_id)
+
+
+def _run_in_worker(job_id):
+    """ Process a job with a connection owned by the worker thread """
+    close_old_connections()
+    try:
+        process_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def process_job(job_id):
+    """ Claim a pending job and generate the renditions of its image """
+    claimed = ImageJob.objects.filter(
+        pk=job_id,
+        status=ImageJob.PENDING,
+    ).update(status=ImageJob.PROCESSING, updated_at=timezone.now())
+    if not claimed:
+        return
+
+    job = ImageJob.objects.select_related('recipe').get(pk=job_id)
+    try:
+        _process(job)
+    except Exception as exc:
+        logger.exception('Failed to process recipe image %s', job.image)
+        job.status = ImageJob.FAILED
+        job.error = str(exc)
+    else:
+        job.status = ImageJob.DONE
+    job.save(update_fields=['image', 'status', 'error', 'updated_at'])
+
+
+def _process(job):
+    """ Strip the image metadata and save its resized renditions """
+    recipe = job.recipe
+    if recipe.image.name != job.image:
+        # A newer upload replaced the image and has its own job
+        return
+
+    storage = recipe.image.storage
+    with storage.open(job.image, 'rb') as image_file:
+        image = Image.open(image_file)
+        image.load()
+    image_format, extension = _stripped_format(image.format, job.image)
+    image = ImageOps.exif_transpose(image)
+
+    # Re-encoding without the info of the upload drops EXIF, GPS, etc.
+    stripped = storage.save(
+        recipe_image_file_path(recipe, f'image{extension}'),
+        ContentFile(_encode(image, image_format)),
+    )
+
+    base = os.path.splitext(stripped)[0]
+    renditions = {}
+    for label, size in RENDITION_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for rendition_format, rendition_extension in get_formats():
+            name = storage.save(
+                f'{base}-{label}.{rendition_extension}',
+                ContentFile(_encode(resized, rendition_format)),
+            )
+            renditions[f'{label}_{rendition_format}'] = name
+
+    updated = Recipe.objects.filter(pk=recipe.pk, image=job.image).update(
+        image=stripped,
+        image_renditions=renditions,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        for name in [stripped, *renditions.values()]:
+            storage.delete(name)
+        return
+
+    # The upload is only deleted once nothing refers to it
+    storage.delete(job.image)
+    job.image = stripped
+
+
+def _stripped_format(image_format, name):
+    """ Return the (format, extension) an upload is re-encoded in
+
+    Formats Pillow cannot write, like the MPO of cameras, are stored as
+    JPEG, their primary image.
+    """
+    image_format = (image_format or '').upper()
+    if image_format == 'MPO' or image_format not in Image.SAVE:
+        return 'jpeg', '.jpg'
+
+    return image_format.lower(), os.path.splitext(name)[1]
+
+
+def _encode(image, image_format):
+    """ Encode an image without metadata """
+    image_format = image_format.lower()
+    if image_format == 'jpeg' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    options = {}
+    if image_format in ('jpeg', 'webp'):
+        options['quality'] = JPEG_QUALITY
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+
+    return buffer.getvalue()
+
+
+def _delete_renditions(recipe):
+    """ Delete the rendition files of a recipe """
+    for name in recipe.image_renditions.values():
+        recipe.image.storage.delete(name)
@@ -0,0 +1,175 @@
+"""
+In-process load generation against the WSGI and ASGI applications
+"""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+
+HOST = 'localhost'
+
+
+def add_query_latency(seconds):
+    """ Delay every query of the process, like a remote database would """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender=None, connection=None, **kwargs):
+        # Sent again whenever a connection reconnects
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(connection=connection)
+
+
+def _split(url):
+    """ Return the path and query string of a URL """
+    parts = urlsplit(url)
+    return parts.path, parts.query
+
+
+def run_wsgi(urls, headers, total, concurrency):
+    """ Send total GET requests cycling over urls from concurrent threads
+
+    Returns the (status, seconds) of every request and the elapsed time.
+    """
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+    def request(i):
+        path, query = _split(urls[i % len(urls)])
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': HOST,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            environ[f'HTTP_{name.upper().replace("-", "_")}'] = value
+        status = []
+        start = time.perf_counter()
+        response = application(
+            environ,
+            lambda line, response_headers: status.append(int(line[:3])),
+        )
+        try:
+            for _ in response:
+                pass
+        finally:
+            # Closing sends request_finished, which releases connections
+            response.close()
+
+        return status[0], time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(request, range(total)))
+
+    return results, time.perf_counter() - start
+
+
+def run_asgi(urls, headers, total, concurrency):
+    """ Send total GET requests cycling over urls from concurrent tasks
+
+    Returns the (status, seconds) of every request and the elapsed time.
+    """
+    from core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    raw_headers = [(b'host', HOST.encode())] + [
+        (name.lower().encode(), value.encode())
+        for name, value in headers.items()
+    ]
+
+    async def request(i):
+        path, query = _split(urls[i % len(urls)])
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': raw_headers,
+            'client': ('127.0.0.1', 0),
+            'server': (HOST, 80),
+        }
+        status = []
+        done = asyncio.Event()
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': b''}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                done.set()
+
+        start = time.perf_counter()
+        await application(scope, receive, send)
+
+        return status[0], time.perf_counter() - start
+
+    async def run():
+        pending = iter(range(total))
+        results = []
+
+        async def worker():
+            for i in pending:
+                results.append(await request(i))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    """ Return the throughput and latencies of a run, in milliseconds """
+    latencies = sorted(seconds * 1000 for status, seconds in results)
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+
+    return {
+        'requests': len(results),
+        'errors': sum(status >= 400 for status, seconds in results),
+        'seconds': elapsed,
+        'throughput': len(results) / elapsed,
+        'p50_ms': quantiles[49],
+        'p95_ms': quantiles[94],
+        'p99_ms': quantiles[98],
+        'max_ms': latencies[-1],
+    }
@@ -0,0 +1,108 @@
+""" Django command to run the recipe API benchmarks """
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from recipe.benchmarks import BENCHMARKS, summarize
+
+
+def get_revision():
+    """ Return the current git commit, if any """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """ Run benchmarks on data created and rolled back for each one """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Benchmarks to run, all by default',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=1000,
+            help='Recipes created for the benchmark user',
+        )
+        parser.add_argument('--fanout', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file, - for stdout',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare medians with',
+        )
+
+    def handle(self, *args, **options):
+        """ Entry point for command """
+        names = options['names'] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f'Unknown benchmarks: {", ".join(unknown)}')
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)['results']
+
+        results = {}
+        for name in names:
+            with transaction.atomic():
+                profiles = BENCHMARKS[name](options)
+                transaction.set_rollback(True)
+            results[name] = {
+                case: summarize(result)
+                for case, result in profiles.items()
+            }
+            if options['output'] != '-':
+                self._write_table(name, results[name], baseline.get(name))
+
+        if options['output']:
+            report = json.dumps({
+                'revision': get_revision(),
+                'created': timezone.now().isoformat(),
+                'options': {
+                    key: options[key]
+                    for key in ('size', 'fanout', 'repeat', 'seed')
+                },
+                'results': results,
+            }, indent=2)
+            if options['output'] == '-':
+                self.stdout.write(report)
+            else:
+                with open(options['output'], 'w') as output_file:
+                    output_file.write(report + '\n')
+
+    def _write_table(self, name, cases, baseline=None):
+        """ Print the summaries of a benchmark """
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        first = None
+        for case, stats in cases.items():
+            first = first or stats['median_ms']
+            line = (
+                f'  {case:<14} median {stats["median_ms"]:9.2f} ms  '
+                f'min {stats["min_ms"]:9.2f} ms  '
+                f'{stats["queries"]:4} queries  '
+                f'peak {stats["peak_bytes"] / 1024:9.1f} KiB  '
+                f'x{first / stats["median_ms"]:.2f}'
+            )
+            previous = (baseline or {}).get(case)
+            if previous:
+                change = stats['median_ms'] / previous['median_ms'] - 1
+                line += f'  {change:+.1%} vs baseline'
+            self.stdout.write(line)
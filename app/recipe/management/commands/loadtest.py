@@ -0,0 +1,165 @@
+""" Django command to compare the API throughput under WSGI and ASGI """
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from recipe import loadtest
+
+
+INTERFACES = {'wsgi': loadtest.run_wsgi, 'asgi': loadtest.run_asgi}
+
+
+class Command(BaseCommand):
+    """ Send concurrent read requests to the in-process WSGI and ASGI
+    applications, e.g. with the data of seed_recipes
+
+    Each interface runs in a process of its own so the ASGI one serves
+    the async views, like app.asgi does.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interface',
+            choices=[*INTERFACES, 'both'],
+            default='both',
+        )
+        parser.add_argument(
+            '--email',
+            default='seed0@example.com',
+            help='User sending the requests',
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='URL requested, repeat for several. The recipe, tag and '
+                 'ingredient lists by default',
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--query-latency',
+            type=float,
+            default=0,
+            help='Milliseconds added to every query, to simulate a remote '
+                 'database',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file, - for stdout',
+        )
+
+    def handle(self, *args, **options):
+        """ Entry point for command """
+        user = get_user_model().objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f'No user {options["email"]}, seed it first')
+
+        if options['interface'] == 'both':
+            results = {
+                interface: self._run_process(interface, options)
+                for interface in INTERFACES
+            }
+        else:
+            results = {
+                options['interface']: self._run(user, options),
+            }
+
+        if options['output']:
+            report = json.dumps({
+                'options': {
+                    key: options[key]
+                    for key in (
+                        'email',
+                        'urls',
+                        'requests',
+                        'concurrency',
+                        'query_latency',
+                    )
+                },
+                'results': results,
+            }, indent=2)
+            if options['output'] == '-':
+                self.stdout.write(report)
+            else:
+                with open(options['output'], 'w') as output_file:
+                    output_file.write(report + '\n')
+        if options['output'] != '-':
+            self._write_table(results)
+
+    def _run(self, user, options):
+        """ Load the application of an interface in this process """
+        token, _ = Token.objects.get_or_create(user=user)
+        urls = options['urls'] or [
+            reverse('recipe:recipe-list'),
+            reverse('recipe:tag-list'),
+            reverse('recipe:ingredient-list'),
+        ]
+        run = INTERFACES[options['interface']]
+        if options['query_latency']:
+            loadtest.add_query_latency(options['query_latency'] / 1000)
+        with override_settings(ALLOWED_HOSTS=[loadtest.HOST]):
+            results, elapsed = run(
+                urls,
+                {'Authorization': f'Token {token.key}'},
+                options['requests'],
+                options['concurrency'],
+            )
+
+        return {
+            **loadtest.summarize(results, elapsed),
+            'async_views': settings.ASYNC_VIEWS,
+        }
+
+    def _run_process(self, interface, options):
+        """ Load the application of an interface in a new process """
+        command = [
+            sys.executable, '-m', 'django', 'loadtest',
+            '--interface', interface,
+            '--email', options['email'],
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+            '--query-latency', str(options['query_latency']),
+            '--output', '-',
+        ]
+        for url in options['urls'] or []:
+            command += ['--url', url]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE',
+                'app.settings',
+            ),
+            'ASYNC_VIEWS': '1' if interface == 'asgi' else '0',
+        }
+        process = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            raise CommandError(f'{interface} run failed:\n{process.stderr}')
+
+        return json.loads(process.stdout)['results'][interface]
+
+    def _write_table(self, results):
+        """ Print the summary of every interface """
+        for interface, stats in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(interface))
+            self.stdout.write(
+                f'  {stats["throughput"]:9.1f} req/s  '
+                f'p50 {stats["p50_ms"]:8.2f} ms  '
+                f'p95 {stats["p95_ms"]:8.2f} ms  '
+                f'p99 {stats["p99_ms"]:8.2f} ms  '
+                f'{stats["errors"]} errors'
+            )
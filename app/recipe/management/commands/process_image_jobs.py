@@ -0,0 +1,37 @@
+""" Django command to process queued recipe image jobs """
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ImageJob
+from recipe import images
+
+
+class Command(BaseCommand):
+    """ Process pending image jobs, e.g. left behind by a restart """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=15,
+            help='Requeue jobs processing for longer than this',
+        )
+
+    def handle(self, *args, **options):
+        """ Entry point for command """
+        stale = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = ImageJob.objects.filter(
+            status=ImageJob.PROCESSING,
+            updated_at__lt=stale,
+        ).update(status=ImageJob.PENDING)
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+        job_ids = ImageJob.objects.filter(
+            status=ImageJob.PENDING,
+        ).order_by('created_at').values_list('id', flat=True)
+        for job_id in job_ids:
+            images.process_job(job_id)
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(job_ids)} jobs'))
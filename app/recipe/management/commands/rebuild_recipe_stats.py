@@ -0,0 +1,52 @@
+""" Django command to rebuild the recipe stats from the recipes """
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import (
+    Recipe,
+    RecipeStats,
+    TagStats,
+    IngredientStats,
+)
+from recipe.bulk import chunked
+
+
+class Command(BaseCommand):
+    """ Recompute the running recipe totals of users, tags and ingredients,
+    e.g. after writes that bypassed the model signals
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            nargs='*',
+            metavar='EMAIL',
+            help='Only rebuild the stats of these users',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Users rebuilt per transaction',
+        )
+
+    def handle(self, *args, **options):
+        """ Entry point for command """
+        users = get_user_model().objects.order_by('pk')
+        if options['users']:
+            users = users.filter(email__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        for chunk in chunked(user_ids, options['chunk_size']):
+            with transaction.atomic():
+                RecipeStats.objects.filter(user_id__in=chunk).delete()
+                TagStats.objects.filter(tag__user_id__in=chunk).delete()
+                IngredientStats.objects.filter(
+                    ingredient__user_id__in=chunk,
+                ).delete()
+                Recipe.objects.filter(user_id__in=chunk).add_to_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the stats of {len(user_ids)} users'
+        ))
@@ -0,0 +1,50 @@
+""" Django command to seed the database with sample recipes """
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipe import seed
+from recipe.bulk import chunked
+
+
+class Command(BaseCommand):
+    """ Create users with recipes, tags and ingredients """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Recipes created for each user',
+        )
+        parser.add_argument(
+            '--fanout',
+            type=int,
+            default=3,
+            help='Average number of tags of a recipe, ingredients are '
+                 'three times as many',
+        )
+        parser.add_argument('--seed', type=int, help='Random seed')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """ Entry point for command """
+        rng = random.Random(options['seed'])
+        for i in range(options['users']):
+            email = f'seed{i}@example.com'
+            user = get_user_model().objects.filter(email=email).first()
+            if user is None:
+                user = get_user_model().objects.create_user(
+                    email,
+                    options['password'],
+                    name=f'Seed user {i}',
+                )
+            for chunk in chunked(range(options['recipes']),
+                                 options['chunk_size']):
+                seed.create_recipes(user, len(chunk), options['fanout'], rng)
+            self.stdout.write(f'{email}: {options["recipes"]} recipes')
+
+        self.stdout.write(self.style.SUCCESS('Database seeded'))
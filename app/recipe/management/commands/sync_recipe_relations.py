@@ -0,0 +1,50 @@
+""" Django command to resync the relation ids copied into recipes """
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+
+from core.models import Recipe, RELATION_ID_FIELDS
+from recipe.bulk import chunked
+from recipe.cache import bump_version
+
+
+class Command(BaseCommand):
+    """ Find recipes whose tag or ingredient ids differ from their links
+    and refresh them
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report out of sync recipes, fail if there are any',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """ Entry point for command """
+        queryset = Recipe.objects.all()
+        stale = Q()
+        for relation, field in RELATION_ID_FIELDS.items():
+            expected = f'expected_{field}'
+            queryset = queryset.annotate(
+                **{expected: Recipe.objects.relation_ids(relation)}
+            )
+            stale |= ~Q(**{field: F(expected)})
+        ids = list(
+            queryset.filter(stale).order_by('id').values_list('id', flat=True)
+        )
+
+        if options['check']:
+            if ids:
+                raise CommandError(f'{len(ids)} recipes out of sync')
+            self.stdout.write(self.style.SUCCESS('Recipes in sync'))
+            return
+
+        user_ids = set()
+        for chunk in chunked(ids, options['chunk_size']):
+            recipes = Recipe.objects.filter(pk__in=chunk)
+            user_ids.update(recipes.values_list('user_id', flat=True))
+            recipes.refresh_derived()
+        for user_id in user_ids:
+            bump_version(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(ids)} recipes'))
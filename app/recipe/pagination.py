@@ -0,0 +1,29 @@
+"""
+Pagination for the recipe APIs
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """ Keyset pagination with a client selectable page size """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """ Paginate recipes newest first using the (user, id) index """
+    ordering = '-id'
+    search_ordering = ('-rank', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        """ Order search results by rank, best match first """
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+
+        return super().get_ordering(request, queryset, view)
+
+
+class NameCursorPagination(BaseCursorPagination):
+    """ Paginate tags and ingredients using the (user, name) index """
+    ordering = ('-name', '-id')
@@ -0,0 +1,45 @@
+"""
+Parsers for the recipe APIs
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.settings import api_settings
+from rest_framework.utils import json
+
+from recipe.renderers import NDJSONRenderer
+
+
+class NDJSONParser(BaseParser):
+    """ Parses newline delimited JSON lazily, one value per line
+
+    The parsed data is a generator of (line number, value) pairs so the
+    body is never held in memory. Lines which are not valid JSON yield a
+    ParseError as their value instead of aborting the whole stream.
+    """
+    media_type = 'application/x-ndjson'
+    renderer_class = NDJSONRenderer
+    strict = api_settings.STRICT_JSON
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """ Return a generator over the lines of the stream """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        return self._iter_lines(stream, encoding)
+
+    def _iter_lines(self, stream, encoding):
+        """ Decode the stream line by line """
+        parse_constant = json.strict_constant if self.strict else None
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                value = json.loads(
+                    line.decode(encoding),
+                    parse_constant=parse_constant,
+                )
+            except ValueError as exc:
+                value = ParseError('JSON parse error - %s' % str(exc))
+            yield number, value
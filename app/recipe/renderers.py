@@ -0,0 +1,95 @@
+"""
+Renderers for the recipe APIs
+"""
+import csv
+import io
+
+from rest_framework import renderers
+
+from core.renderers import FastJSONRenderer
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """ Renderer which serializes every item on its own JSON line """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """ Render a list of items, or a single item, into NDJSON """
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+
+        return b''.join(self.render_stream([data]))
+
+    def render_stream(self, batches):
+        """ Yield the NDJSON bytes of each batch of items """
+        for batch in batches:
+            lines = [
+                super(NDJSONRenderer, self).render(item) + b'\n'
+                for item in batch
+            ]
+            if lines:
+                yield b''.join(lines)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """ Renderer which serializes a list of flat items into CSV
+
+    Nested lists become a single cell joining their items, using the
+    nested_label key of items that are objects (e.g. tag names). Text
+    cells a spreadsheet would run as a formula are prefixed with a quote.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    list_separator = '|'
+    nested_label = 'name'
+    formula_prefixes = ('=', '+', '-', '@', '\t', '\r')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """ Render a list of items, or a single item, into CSV """
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+
+        return b''.join(self.render_stream([data]))
+
+    def render_stream(self, batches):
+        """ Yield the CSV bytes of each batch, starting with a header """
+        header = None
+        for batch in batches:
+            if not batch:
+                continue
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if header is None:
+                header = list(batch[0])
+                writer.writerow(header)
+            writer.writerows(
+                [self._escape(self._cell(item.get(key))) for key in header]
+                for item in batch
+            )
+            yield buffer.getvalue().encode(self.charset)
+
+    def _cell(self, value):
+        """ Convert a value into a CSV cell """
+        if value is None:
+            return ''
+        if isinstance(value, list):
+            return self.list_separator.join(
+                str(self._cell(item)) for item in value
+            )
+        if isinstance(value, dict):
+            return value.get(self.nested_label, '')
+
+        return value
+
+    def _escape(self, value):
+        """ Keep spreadsheets from evaluating a text cell as a formula """
+        if isinstance(value, str) and value.startswith(self.formula_prefixes):
+            return f"'{value}"
+
+        return value
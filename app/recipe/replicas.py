@@ -0,0 +1,46 @@
+"""
+Reads of the recipe APIs from the database replicas
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+from core import routers
+
+
+class ReplicaReadMixin:
+    """ Serve the safe requests of a view from a database replica
+
+    Authentication and permissions read from the primary, the view
+    itself from one of DATABASE_REPLICAS. A successful write pins its
+    user to the primary for DATABASE_REPLICA_PIN_SECONDS, so the next
+    reads see it even if the replicas lag behind.
+
+    Routing ends with the view, the reads and writes of streamed
+    responses (exports, imports) use the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """ Handle the request with reads routed by initial """
+        with routers.replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """ Handle the async request with reads routed by initial """
+        with routers.replica_reads():
+            return await super().adispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        """ Read from a replica once the request is allowed """
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            routers.route_reads(request.user.pk)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """ Pin the user to the primary after a successful write """
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            routers.pin_to_primary(request.user.pk)
+
+        return super().finalize_response(request, response, *args, **kwargs)
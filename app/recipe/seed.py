@@ -0,0 +1,73 @@
+"""
+Generation of realistic recipe data for development and benchmarks
+"""
+import random
+from decimal import Decimal
+
+from recipe import bulk
+
+
+TAG_NAMES = [
+    'Breakfast', 'Brunch', 'Lunch', 'Dinner', 'Dessert', 'Snack',
+    'Vegan', 'Vegetarian', 'Gluten free', 'Dairy free', 'Low carb',
+    'Quick', 'Slow cooker', 'One pot', 'Grill', 'Baking', 'Spicy',
+    'Comfort food', 'Healthy', 'Party', 'Kids', 'Holiday', 'Summer',
+    'Winter', 'Italian', 'Mexican', 'Indian', 'Thai', 'French', 'Greek',
+]
+INGREDIENT_NAMES = [
+    'Salt', 'Pepper', 'Olive oil', 'Butter', 'Garlic', 'Onion', 'Shallot',
+    'Tomato', 'Potato', 'Carrot', 'Celery', 'Spinach', 'Kale', 'Lettuce',
+    'Cucumber', 'Bell pepper', 'Chili', 'Ginger', 'Lemon', 'Lime',
+    'Basil', 'Parsley', 'Coriander', 'Thyme', 'Rosemary', 'Oregano',
+    'Cumin', 'Paprika', 'Cinnamon', 'Flour', 'Sugar', 'Brown sugar',
+    'Honey', 'Egg', 'Milk', 'Cream', 'Yogurt', 'Cheddar', 'Parmesan',
+    'Mozzarella', 'Feta', 'Rice', 'Pasta', 'Noodles', 'Bread', 'Quinoa',
+    'Lentils', 'Chickpeas', 'Black beans', 'Tofu', 'Chicken breast',
+    'Chicken thigh', 'Beef mince', 'Pork shoulder', 'Bacon', 'Salmon',
+    'Prawns', 'Cod', 'Mushroom', 'Zucchini', 'Eggplant', 'Avocado',
+    'Coconut milk', 'Soy sauce', 'Fish sauce', 'Vinegar', 'Mustard',
+    'Chocolate', 'Vanilla', 'Oats', 'Almonds', 'Walnuts', 'Banana',
+    'Apple', 'Strawberry', 'Blueberry', 'Peach', 'Mango', 'Pineapple',
+]
+DISHES = [
+    'soup', 'stew', 'salad', 'curry', 'pie', 'tart', 'bake', 'risotto',
+    'stir fry', 'tacos', 'burger', 'skewers', 'pancakes', 'smoothie',
+    'casserole', 'roast', 'sandwich', 'bowl', 'frittata', 'crumble',
+]
+STYLES = [
+    'Classic', 'Easy', 'Creamy', 'Crispy', 'Smoky', 'Zesty', 'Rustic',
+    'Spicy', 'Homemade', 'Roasted', 'Grandma\'s', 'Weeknight',
+]
+
+
+def _sample(rng, population, mean):
+    """ Pick around mean distinct items of a population """
+    count = max(1, min(len(population), round(rng.gauss(mean, mean / 2))))
+    return rng.sample(population, count)
+
+
+def create_recipes(user, count, fanout=3, rng=None):
+    """ Create recipes of a user with tags and ingredients in bulk
+
+    Every recipe gets around fanout tags and three times as many
+    ingredients, picked from shared vocabularies so names repeat
+    across recipes like in real data.
+    """
+    rng = rng or random.Random()
+    rows = []
+    for _ in range(count):
+        ingredients = _sample(rng, INGREDIENT_NAMES, fanout * 3)
+        rows.append({
+            'title': f'{rng.choice(STYLES)} {ingredients[0].lower()} '
+                     f'{rng.choice(DISHES)}',
+            'description': f'Made with {", ".join(ingredients).lower()}.',
+            'time_minutes': rng.randint(5, 240),
+            'price': Decimal(rng.randint(100, 9999)) / 100,
+            'link': f'https://example.com/recipes/{rng.getrandbits(32):x}',
+            'tags': [
+                {'name': name} for name in _sample(rng, TAG_NAMES, fanout)
+            ],
+            'ingredients': [{'name': name} for name in ingredients],
+        })
+
+    return bulk.create_recipes(user, rows)
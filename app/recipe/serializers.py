@@ -1,34 +1,139 @@
 """
 Serializers for Recipe API
 """
+from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
-from core.models import Recipe, Tag, Ingredient
+from core.metrics import TimedListSerializer, TimedSerializerMixin
+from core.models import ImageJob, Recipe, Tag, Ingredient
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class NamedObjectSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
+    """ Base serializer for objects named uniquely per user """
+
+    def validate_name(self, value):
+        """ Reject renaming to a name the user already has """
+        if self.instance is not None:
+            taken = self.Meta.model.objects.filter(
+                user=self.instance.user,
+                name=value,
+            ).exclude(pk=self.instance.pk).exists()
+            if taken:
+                msg = _('An object with this name already exists')
+                raise serializers.ValidationError(msg, code='unique')
+
+        return value
+
+
+class IngredientSerializer(NamedObjectSerializer):
     """ Serializer for ingredient """
 
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
+        list_serializer_class = TimedListSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(NamedObjectSerializer):
     """ Serializer for the tag model """
 
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
+        list_serializer_class = TimedListSerializer
+
+
+class IngredientCountSerializer(IngredientSerializer):
+    """ Serializer for ingredients listed with their number of recipes """
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagCountSerializer(TagSerializer):
+    """ Serializer for tags listed with their number of recipes """
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+class FieldSelectionMixin:
+    """ Serialize only the fields and expanded relations requested
+
+    The 'fields' and 'expand' context entries hold the requested names,
+    or None for all of them. Relations not expanded are listed as ids.
+    """
+    expandable_fields = []
+    # Model fields read by serializer fields not backed by one
+    field_sources = {}
+
+    def get_fields(self):
+        """ Return the requested fields """
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        expand = self.context.get('expand')
+
+        if selected is not None:
+            unknown = selected - set(fields)
+            if unknown:
+                raise serializers.ValidationError({
+                    'fields': _('Unknown fields: %s') % ', '.join(
+                        sorted(unknown)
+                    ),
+                })
+            fields = {
+                name: field
+                for name, field in fields.items()
+                if name in selected
+            }
+
+        if expand is not None:
+            unknown = expand - set(self.expandable_fields)
+            if unknown:
+                raise serializers.ValidationError({
+                    'expand': _('Unknown relations: %s') % ', '.join(
+                        sorted(unknown)
+                    ),
+                })
+            for name in self.expandable_fields:
+                if name in fields and name not in expand:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        many=True,
+                        read_only=True,
+                    )
+
+        return fields
 
+    def get_model_fields(self):
+        """ Return the concrete model fields read by the selected fields """
+        names = set()
+        for name, field in self.fields.items():
+            if name in self.field_sources:
+                names.update(self.field_sources[name])
+            elif name not in self.expandable_fields:
+                names.add(field.source)
 
-class RecipeSerializer(serializers.ModelSerializer):
+        return sorted(names)
+
+    def is_expanded(self, name):
+        """ Return whether a selected relation is nested """
+        expand = self.context.get('expand')
+        return expand is None or name in expand
+
+
+class RecipeSerializer(FieldSelectionMixin,
+                       TimedSerializerMixin,
+                       serializers.ModelSerializer):
     """ Serializer for the recipe Model """
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    expandable_fields = ['tags', 'ingredients']
 
     class Meta:
         model = Recipe
@@ -44,36 +149,33 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id'
         ]
+        list_serializer_class = TimedListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """ Handle getting or creatings tags """
+    def _get_or_create_tags(self, tags):
+        """ Handle getting or creating tags in bulk """
         auth_user = self.context['request'].user
 
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        return Tag.objects.get_or_create_by_names(
+            auth_user,
+            [tag['name'] for tag in tags],
+        )
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """ Handle getting or creatings tags """
+    def _get_or_create_ingredients(self, ingredients):
+        """ Handle getting or creating ingredients in bulk """
         auth_user = self.context['request'].user
 
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        return Ingredient.objects.get_or_create_by_names(
+            auth_user,
+            [ingredient['name'] for ingredient in ingredients],
+        )
 
     def create(self, validated_data):
         """ Create a recipe """
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
 
         return recipe
 
@@ -82,11 +184,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients)
+            )
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
@@ -95,9 +197,102 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
     """ Serializer for recipe detail view """
+    renditions = serializers.SerializerMethodField()
+    field_sources = {'renditions': ['image', 'image_renditions']}
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description',
+            'image',
+            'renditions',
+        ]
+
+    def get_renditions(self, recipe) -> dict:
+        """ Return the URLs of the processed image renditions """
+        request = self.context.get('request')
+        urls = {}
+        for name, path in recipe.image_renditions.items():
+            url = recipe.image.storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """ Serializer for the recipes fetched by a list of IDs """
+    results = RecipeDetailSerializer(many=True)
+    missing = serializers.ListField(child=serializers.IntegerField())
+
+
+class BulkUpdateItemMixin:
+    """ Require the ID of the object changed by every item """
+
+    def validate(self, attrs):
+        """ Reject items without an ID, the other fields are optional """
+        if 'id' not in attrs:
+            raise serializers.ValidationError({
+                'id': _('This field is required.'),
+            })
+
+        return attrs
+
+
+class RecipeBulkUpdateSerializer(BulkUpdateItemMixin,
+                                 serializers.ModelSerializer):
+    """ Serializer for the changes of a recipe in a bulk update """
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'id',
+            'title',
+            'time_minutes',
+            'price',
+            'link',
+            'description',
+        ]
+
+
+class TagBulkUpdateSerializer(BulkUpdateItemMixin,
+                              serializers.ModelSerializer):
+    """ Serializer for the changes of a tag in a bulk update """
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Tag
+        fields = ['id', 'name']
+
+
+class IngredientBulkUpdateSerializer(BulkUpdateItemMixin,
+                                     serializers.ModelSerializer):
+    """ Serializer for the changes of an ingredient in a bulk update """
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Ingredient
+        fields = ['id', 'name']
+
+
+class BulkUpdateResultSerializer(serializers.Serializer):
+    """ Serializer for the summary of a bulk update """
+    updated = serializers.IntegerField()
+    missing = serializers.ListField(child=serializers.IntegerField())
+
+
+class BulkDeleteResultSerializer(serializers.Serializer):
+    """ Serializer for the summary of a bulk delete """
+    deleted = serializers.IntegerField()
+    # Links between recipes and tags or ingredients removed
+    detached = serializers.IntegerField()
+    missing = serializers.ListField(child=serializers.IntegerField())
+
+
+class RecipeImportSerializer(RecipeSerializer):
+    """ Serializer for validating recipes of a bulk import """
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['description']
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -112,3 +307,31 @@ class RecipeImageSerializer(serializers.ModelSerializer):
                 'required': 'True'
             }
         }
+
+
+class RecipeImageJobSerializer(serializers.Serializer):
+    """ Serializer for the processing of an uploaded recipe image """
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=ImageJob.STATUS_CHOICES)
+    # Recipe detail, showing the image and its renditions once processed
+    url = serializers.URLField()
+
+
+class RecipeCountSerializer(serializers.Serializer):
+    """ Serializer for the recipe count of a tag or an ingredient """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipe_count = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """ Serializer for the recipe stats of a user """
+    recipe_count = serializers.IntegerField()
+    average_price = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        allow_null=True,
+    )
+    average_time_minutes = serializers.FloatField(allow_null=True)
+    tags = RecipeCountSerializer(many=True)
+    ingredients = RecipeCountSerializer(many=True)
@@ -0,0 +1,29 @@
+"""
+Signal handlers for the recipe APIs
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import bump_version
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_named_object(sender, instance, **kwargs):
+    """ Invalidate cached lists when a tag or ingredient changes """
+    bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_relations(sender, instance, action, **kwargs):
+    """ Invalidate cached lists when recipe relations change """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_deleted_recipe(sender, instance, **kwargs):
+    """ Invalidate cached lists counting the links of a deleted recipe """
+    bump_version(instance.user_id)
@@ -0,0 +1,169 @@
+"""
+Tests for the async handlers of the recipe APIs
+"""
+import asyncio
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.async_views import in_thread
+from recipe.views import RecipeViewSet, TagViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """ Create and return a recipe detail URL """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(ASYNC_VIEWS=True)
+@patch.dict(connections.databases['default'], {'CONN_MAX_AGE': 0})
+class AsyncViewTests(TransactionTestCase):
+    """ Test the async views answer like the sync ones
+
+    The async handlers read the database from worker threads, which only
+    see committed data and must not keep connections to the test database.
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('1.50'),
+            )
+            recipe.tags.add(
+                Tag.objects.get_or_create(user=self.user, name=f'Tag {i}')[0],
+                Tag.objects.get_or_create(user=self.user, name='Shared')[0],
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Salt {i}'),
+            )
+        self.recipe = recipe
+
+    def call(self, viewset, actions, path, user=None, **kwargs):
+        """ Run a request through the async view of a viewset """
+        view = viewset.as_view(actions)
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        method = next(iter(actions))
+        request = getattr(self.factory, method)(path, **kwargs.pop(
+            'data_kwargs',
+            {},
+        ))
+        force_authenticate(request, user=user or self.user)
+
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_list_recipes(self):
+        """ Test listing recipes asynchronously """
+        for params in ['', '?expand=tags', '?fields=id,title,tags']:
+            res = self.call(
+                RecipeViewSet,
+                {'get': 'list'},
+                RECIPES_URL + params,
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                res.data,
+                self.client.get(RECIPES_URL + params).data,
+            )
+            self.assertIn('ETag', res)
+
+    def test_retrieve_recipe(self):
+        """ Test retrieving a recipe asynchronously """
+        url = detail_url(self.recipe.id)
+
+        res = self.call(
+            RecipeViewSet,
+            {'get': 'retrieve'},
+            url,
+            pk=str(self.recipe.id),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.client.get(url).data)
+
+    def test_retrieve_other_user_recipe_not_found(self):
+        """ Test recipes of other users are not found """
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'password',
+        )
+
+        for pk in [str(self.recipe.id), 'x']:
+            res = self.call(
+                RecipeViewSet,
+                {'get': 'retrieve'},
+                detail_url(self.recipe.id),
+                user=other,
+                pk=pk,
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sync_actions_still_served(self):
+        """ Test actions without async handler run the sync one """
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '2.00'}
+
+        res = self.call(
+            RecipeViewSet,
+            {'post': 'create'},
+            RECIPES_URL,
+            data_kwargs={'data': payload, 'format': 'json'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Recipe.objects.filter(title='New').exists())
+
+    def test_list_tags(self):
+        """ Test listing tags asynchronously """
+        res = self.call(TagViewSet, {'get': 'list'}, TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.client.get(TAGS_URL).data)
+
+    def test_auth_required(self):
+        """ Test async views authenticate requests """
+        view = RecipeViewSet.as_view({'get': 'list'})
+
+        res = async_to_sync(view)(self.factory.get(RECIPES_URL))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_worker_connection_released(self):
+        """ Test worker threads end their checkout and connection """
+        def query():
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return connections['default']
+
+        worker_connection = async_to_sync(in_thread)(query)
+
+        self.assertIsNot(worker_connection, connections['default'])
+        self.assertFalse(worker_connection.checked_out)
+        self.assertIsNone(worker_connection.connection)
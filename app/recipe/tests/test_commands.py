@@ -0,0 +1,190 @@
+"""
+Tests for the recipe management commands
+"""
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.models import Recipe, RecipeStats, Tag, TagStats, Ingredient
+
+
+class BenchmarkCommandTests(TestCase):
+    """ Test the benchmark command """
+
+    def test_benchmark_runs_and_rolls_back(self):
+        """ Test running a benchmark leaves no data behind """
+        out = StringIO()
+
+        call_command('benchmark', 'list-rendering', size=5, repeat=1,
+                     stdout=out)
+
+        self.assertIn('list-rendering', out.getvalue())
+        self.assertIn('rows', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_json_output(self):
+        """ Test writing the benchmark results as JSON """
+        out = StringIO()
+
+        call_command('benchmark', 'api', size=5, repeat=1, output='-',
+                     stdout=out)
+
+        results = json.loads(out.getvalue())['results']['api']
+        self.assertEqual(
+            set(results),
+            {'list', 'filter', 'detail', 'create', 'update'},
+        )
+        self.assertGreater(results['list']['queries'], 0)
+        self.assertGreater(results['create']['peak_bytes'], 0)
+
+    @override_settings(DATABASE_REPLICAS=['replica0'])
+    def test_benchmark_existing_user_and_replicas(self):
+        """ Test the benchmark runs on a database with users, reading its
+        uncommitted data from the primary instead of the replicas
+        """
+        get_user_model().objects.create_user(
+            'benchmark@example.com',
+            'password',
+        )
+        out = StringIO()
+
+        call_command('benchmark', 'api', size=5, repeat=1, output='-',
+                     stdout=out)
+
+        results = json.loads(out.getvalue())['results']['api']
+        self.assertGreater(results['detail']['queries'], 0)
+
+    def test_unknown_benchmark_error(self):
+        """ Test running an unknown benchmark fails """
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'missing')
+
+
+class SeedCommandTests(TestCase):
+    """ Test the seed_recipes command """
+
+    def test_seed_recipes(self):
+        """ Test seeding users with recipes, tags and ingredients """
+        call_command('seed_recipes', users=2, recipes=7, chunk_size=3,
+                     seed=1, stdout=StringIO())
+
+        users = get_user_model().objects.filter(email__startswith='seed')
+        self.assertEqual(users.count(), 2)
+        for user in users:
+            recipes = Recipe.objects.filter(user=user)
+            self.assertEqual(recipes.count(), 7)
+            self.assertTrue(Tag.objects.filter(user=user).exists())
+            self.assertTrue(Ingredient.objects.filter(user=user).exists())
+            for recipe in recipes:
+                self.assertTrue(recipe.tags.exists())
+                self.assertTrue(recipe.ingredients.exists())
+
+    def test_seed_recipes_adds_to_existing_users(self):
+        """ Test seeding again adds recipes to the same users """
+        call_command('seed_recipes', users=1, recipes=2, stdout=StringIO())
+        call_command('seed_recipes', users=1, recipes=2, stdout=StringIO())
+
+        self.assertEqual(get_user_model().objects.count(), 1)
+        self.assertEqual(Recipe.objects.count(), 4)
+
+
+class SyncRecipeRelationsCommandTests(TestCase):
+    """ Test the sync_recipe_relations command """
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Recipe',
+            time_minutes=5,
+            price='1.00',
+        )
+        self.tag = Tag.objects.create(user=user, name='Vegan')
+        self.recipe.tags.add(self.tag)
+
+    def test_check_in_sync(self):
+        """ Test checking recipes whose ids match their links """
+        out = StringIO()
+
+        call_command('sync_recipe_relations', check=True, stdout=out)
+
+        self.assertIn('in sync', out.getvalue())
+
+    def test_check_and_sync_stale_recipes(self):
+        """ Test out of sync recipes are reported and then fixed """
+        Recipe.objects.update(tag_ids=[])
+
+        with self.assertRaisesMessage(CommandError, '1 recipes out of sync'):
+            call_command('sync_recipe_relations', check=True)
+
+        call_command('sync_recipe_relations', stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.tag_ids, [self.tag.id])
+
+
+class RebuildRecipeStatsCommandTests(TestCase):
+    """ Test the rebuild_recipe_stats command """
+
+    def test_rebuild_recipe_stats(self):
+        """ Test stats out of sync are recomputed from the recipes """
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        recipe = Recipe.objects.create(
+            user=user,
+            title='Recipe',
+            time_minutes=5,
+            price='1.50',
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        recipe.tags.add(tag)
+        RecipeStats.objects.filter(user=user).update(recipe_count=7)
+        TagStats.objects.all().delete()
+
+        call_command('rebuild_recipe_stats', stdout=StringIO())
+
+        stats = RecipeStats.objects.get(user=user)
+        self.assertEqual(stats.recipe_count, 1)
+        self.assertEqual(stats.price_total, Decimal('1.50'))
+        self.assertEqual(stats.time_minutes_total, 5)
+        self.assertEqual(TagStats.objects.get(tag=tag).recipe_count, 1)
+
+
+@patch.dict(connections.databases['default'], {'CONN_MAX_AGE': 0})
+class LoadtestCommandTests(TransactionTestCase):
+    """ Test the loadtest command
+
+    Requests run in other threads, which only see committed data and must
+    not keep connections to the test database.
+    """
+
+    def test_loadtest_interfaces(self):
+        """ Test loading the WSGI and ASGI applications """
+        call_command('seed_recipes', users=1, recipes=3, stdout=StringIO())
+
+        for interface in ['wsgi', 'asgi']:
+            out = StringIO()
+            call_command('loadtest', interface=interface, requests=6,
+                         concurrency=2, output='-', stdout=out)
+
+            results = json.loads(out.getvalue())['results'][interface]
+            self.assertEqual(results['requests'], 6)
+            self.assertEqual(results['errors'], 0)
+            self.assertGreater(results['throughput'], 0)
+
+    def test_loadtest_unknown_user_error(self):
+        """ Test load testing requires an existing user """
+        with self.assertRaises(CommandError):
+            call_command('loadtest', email='missing@example.com')
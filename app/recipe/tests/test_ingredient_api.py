@@ -8,11 +8,14 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
-from recipe.serializers import IngredientSerializer
+from core.models import Ingredient, Recipe
+from recipe.filters import with_recipe_count
+from recipe.serializers import IngredientCountSerializer
 
 
 INGREDIENT_URL = reverse('recipe:ingredient-list')
+SUGGEST_URL = reverse('recipe:ingredient-suggest')
+BATCH_URL = reverse('recipe:ingredient-batch-update')
 
 
 def detail_url(ingredient_id):
@@ -54,10 +57,12 @@ class PrivateIngredientAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        ingredients = Ingredient.objects.all().order_by('-name')
-        serializer = IngredientSerializer(ingredients, many=True)
+        ingredients = with_recipe_count(
+            Ingredient.objects.all(),
+        ).order_by('-name')
+        serializer = IngredientCountSerializer(ingredients, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         """ Test that list of ingredient is limited to user """
@@ -69,9 +74,9 @@ class PrivateIngredientAPITest(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
     def test_update_ingredient(self):
         """ Test updating an ingredient """
@@ -94,3 +99,65 @@ class PrivateIngredientAPITest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         ingredients = Ingredient.objects.filter(user=self.user)
         self.assertFalse(ingredients.exists())
+
+    def test_bulk_delete_ingredients(self):
+        """ Test deleting several ingredients in one request """
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Salt', 'Pepper', 'Lime']
+        ]
+        self.client.get(INGREDIENT_URL)
+
+        res = self.client.delete(
+            f'{BATCH_URL}?ids={ingredients[0].id},{ingredients[1].id}',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        res = self.client.get(INGREDIENT_URL)
+        self.assertEqual(
+            [ingredient['name'] for ingredient in res.data['results']],
+            ['Lime'],
+        )
+
+    def test_ingredient_cache_invalidated_on_delete(self):
+        """ Test deleting an ingredient invalidates the cached list """
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        res = self.client.get(INGREDIENT_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+        self.client.delete(detail_url(ingredient.id))
+        res = self.client.get(INGREDIENT_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_filter_ingredients_assigned_to_recipes(self):
+        """ Test listing ingredients by those assigned to recipes """
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Chips',
+            time_minutes=5,
+            price='1.00',
+        )
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [
+            {'id': ingredient.id, 'name': 'Salt', 'recipe_count': 1},
+        ])
+
+    def test_suggest_ingredients(self):
+        """ Test suggesting ingredient names """
+        ingredient = Ingredient.objects.create(user=self.user, name='Tomato')
+        Ingredient.objects.create(user=self.user, name='Potato')
+        Ingredient.objects.create(user=self.user, name='Basil')
+
+        res = self.client.get(SUGGEST_URL, {'q': 'tom'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0], {'id': ingredient.id, 'name': 'Tomato'})
+        self.assertNotIn('Basil', [item['name'] for item in res.data])
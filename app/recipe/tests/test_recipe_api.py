@@ -3,23 +3,30 @@ Tests for Recipe API
 """
 
 from decimal import Decimal
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, ImageJob
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer, IngredientSerializer
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BATCH_URL = reverse('recipe:recipe-batch')
 
 
 def detailt_url(recipe_id):
@@ -88,7 +95,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """ Test list of recipes is limited to authenticated user """
@@ -105,7 +112,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """ Test get recipe details """
@@ -418,9 +425,9 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """ Test filtering recipes by ingredients """
@@ -439,9 +446,402 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_tags_match_all(self):
+        """ Test filtering recipes having all the given tags """
+        r1 = create_recipe(user=self.user, title='Spicy vegan curry')
+        r2 = create_recipe(user=self.user, title='Spicy wings')
+        tag1 = Tag.objects.create(user=self.user, name='Spicy')
+        tag2 = Tag.objects.create(user=self.user, name='Vegan')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [r1.id],
+        )
+
+    def test_filter_matching_several_tags_returns_recipe_once(self):
+        """ Test a recipe matching many tags is not duplicated """
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Spicy')
+        tag2 = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipe.id],
+        )
+        self.assertNotIn('DISTINCT', ctx.captured_queries[0]['sql'])
+
+    def test_filter_invalid_match_error(self):
+        """ Test an unknown match mode is rejected """
+        res = self.client.get(RECIPES_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _create_recipes_with_relations(self, count):
+        """ Create recipes each with its own tags and ingredients """
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}'),
+                Tag.objects.create(user=self.user, name=f'Other {recipe.id}'),
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'{recipe.id}')
+            )
+
+    def test_list_query_count_is_constant(self):
+        """ Test listing recipes does not query once per recipe """
+        self._create_recipes_with_relations(2)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        self._create_recipes_with_relations(8)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 10)
+        self.assertEqual(len(res.data['results'][0]['tags']), 2)
+        self.assertEqual(len(res.data['results'][0]['ingredients']), 1)
+
+    def test_detail_prefetches_relations(self):
+        """ Test recipe detail fetches relations in fixed queries """
+        self._create_recipes_with_relations(1)
+        recipe = Recipe.objects.get(user=self.user)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detailt_url(recipe.id))
+
+        serializer = RecipeDetailSerializer(recipe)
+        self.assertEqual(res.data, serializer.data)
+
+    def test_batch_retrieve_in_requested_order(self):
+        """ Test fetching recipes by IDs in fixed queries and order """
+        self._create_recipes_with_relations(2)
+        recipes = list(Recipe.objects.filter(user=self.user).order_by('id'))
+        other_recipe = create_recipe(
+            user=create_user(email='other@example.com', password='test123'),
+        )
+        ids = [recipes[1].id, 0, recipes[0].id, other_recipe.id]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(BATCH_URL, {
+                'ids': ','.join(str(pk) for pk in ids + [recipes[1].id]),
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        serializer = RecipeDetailSerializer(recipes[::-1], many=True)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(res.data['missing'], [0, other_recipe.id])
+
+        self._create_recipes_with_relations(8)
+        ids = ','.join(
+            str(recipe.id) for recipe in Recipe.objects.filter(user=self.user)
+        )
+        with self.assertNumQueries(3):
+            res = self.client.get(BATCH_URL, {'ids': ids})
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_batch_retrieve_selected_fields(self):
+        """ Test selecting the fields of the recipes fetched by IDs """
+        recipe = create_recipe(user=self.user)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(BATCH_URL, {
+                'ids': str(recipe.id),
+                'fields': 'id,title',
+            })
+
+        self.assertEqual(res.data['results'], [
+            {'id': recipe.id, 'title': recipe.title},
+        ])
+
+    def test_batch_retrieve_not_modified(self):
+        """ Test fetching fresh recipes by IDs answers 304 unserialized """
+        recipes = [create_recipe(user=self.user) for _ in range(2)]
+        params = {'ids': f'{recipes[1].id},{recipes[0].id},0'}
+        res = self.client.get(BATCH_URL, params)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(
+                BATCH_URL,
+                params,
+                HTTP_IF_NONE_MATCH=res['ETag'],
+            )
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertEqual(not_modified['ETag'], res['ETag'])
+
+        recipes[0].title = 'Changed'
+        recipes[0].save()
+        modified = self.client.get(
+            BATCH_URL,
+            params,
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified.data['results'][1]['title'], 'Changed')
+
+    def test_batch_retrieve_invalid_ids_error(self):
+        """ Test fetching recipes needs a bounded list of integer IDs """
+        too_many = ','.join(str(pk) for pk in range(1, 52))
+        for params in [{}, {'ids': '1,a'}, {'ids': too_many}]:
+            res = self.client.get(BATCH_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Repeated IDs count once
+        res = self.client.get(BATCH_URL, {'ids': ','.join(['1'] * 51)})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['missing'], [1])
+
+    def test_list_cursor_pagination(self):
+        """ Test recipes are paginated with a cursor newest first """
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+    def _count_create_queries(self, size):
+        """ Count the queries used to create a recipe with relations """
+        payload = {
+            'title': f'Recipe with {size} of each',
+            'time_minutes': 10,
+            'price': Decimal('5.00'),
+            'tags': [{'name': f'Tag {i}'} for i in range(size)],
+            'ingredients': [{'name': f'Ing {i}'} for i in range(size)],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(ctx.captured_queries)
+
+    def test_create_recipe_queries_independent_of_relations(self):
+        """ Test writing tags and ingredients is batched """
+        Tag.objects.create(user=self.user, name='Tag 0')
+
+        self.assertEqual(
+            self._count_create_queries(2),
+            self._count_create_queries(30),
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_create_recipe_with_repeated_tag_names(self):
+        """ Test repeated names in a payload create a single tag """
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': Decimal('9.99'),
+            'tags': [{'name': 'Spicy'}, {'name': 'Spicy'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_recipe_touched_on_relation_change(self):
+        """ Test updated_at moves when tags change or are renamed """
+        recipe = create_recipe(user=self.user)
+        created_at = recipe.updated_at
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+
+        recipe.tags.add(tag)
+        recipe.refresh_from_db()
+        added_at = recipe.updated_at
+        tag.name = 'Hot'
+        tag.save()
+        recipe.refresh_from_db()
+
+        self.assertGreater(added_at, created_at)
+        self.assertGreater(recipe.updated_at, added_at)
+
+    def test_detail_conditional_get(self):
+        """ Test recipe detail answers 304 while unchanged """
+        recipe = create_recipe(user=self.user)
+        url = detailt_url(recipe.id)
+        res = self.client.get(url)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(
+                url,
+                HTTP_IF_NONE_MATCH=res['ETag'],
+            )
+        by_date = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+        self.client.patch(url, {'title': 'New title'})
+        modified = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified.data['title'], 'New title')
+
+    def test_detail_conditional_get_invalid_id(self):
+        """ Test a conditional request for a malformed ID is not found """
+        url = reverse('recipe:recipe-detail', args=['abc'])
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='"etag"')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_conditional_get(self):
+        """ Test recipe list answers 304 until a listed recipe changes """
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        recipe.tags.add(tag)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        tag.name = 'Hot'
+        tag.save()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Hot')
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_not_validated_by_date(self):
+        """ Test lists have no Last-Modified, deletions do not move it """
+        create_recipe(user=self.user)
+        deleted = create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('Last-Modified', res)
+
+        deleted.delete()
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_selected_fields(self):
+        """ Test listing only the requested fields """
+        self._create_recipes_with_relations(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title,price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in res.data['results']:
+            self.assertEqual(list(recipe), ['id', 'title', 'price'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"link"', queries[0]['sql'])
+
+    def test_list_relations_as_ids(self):
+        """ Test relations not expanded are listed as ids """
+        self._create_recipes_with_relations(1)
+        recipe = Recipe.objects.get(user=self.user)
+        tag_ids = sorted(tag.id for tag in recipe.tags.all())
+        ingredient = recipe.ingredients.get()
+
+        res = self.client.get(RECIPES_URL, {'expand': 'ingredients'})
+
+        result = res.data['results'][0]
+        self.assertEqual(sorted(result['tags']), tag_ids)
+        self.assertEqual(
+            result['ingredients'],
+            [{'id': ingredient.id, 'name': ingredient.name}],
+        )
+
+        res = self.client.get(RECIPES_URL, {'expand': ''})
+
+        self.assertEqual(sorted(res.data['results'][0]['tags']), tag_ids)
+        self.assertEqual(
+            res.data['results'][0]['ingredients'],
+            [ingredient.id],
+        )
+
+    def test_detail_selected_fields(self):
+        """ Test retrieving only the requested fields of a recipe """
+        recipe = create_recipe(user=self.user)
+        url = detailt_url(recipe.id)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, {'fields': 'title,description'})
+
+        self.assertEqual(res.data, {
+            'title': recipe.title,
+            'description': recipe.description,
+        })
+        self.assertNotEqual(res['ETag'], self.client.get(url)['ETag'])
+
+    def test_unknown_selected_fields_error(self):
+        """ Test selecting unknown fields or relations fails """
+        recipe = create_recipe(user=self.user)
+
+        for params in [{'fields': 'id,secret'}, {'expand': 'user'}]:
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+            res = self.client.get(detailt_url(recipe.id), params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _render_with_serializer(self, **context):
+        """ Render the recipes of the user with the list serializer """
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(recipes, many=True, context=context)
+
+        return JSONRenderer().render(serializer.data)
+
+    def test_list_rendered_like_serializer(self):
+        """ Test the rendered list equals the serializer output """
+        self._create_recipes_with_relations(3)
+        create_recipe(user=self.user, link='', price=Decimal('5'))
+
+        res = self.client.get(RECIPES_URL)
+
+        results = json.loads(res.content)['results']
+        self.assertEqual(
+            JSONRenderer().render(results),
+            self._render_with_serializer(),
+        )
+
+    def test_list_selection_rendered_like_serializer(self):
+        """ Test selected lists equal the serializer output """
+        self._create_recipes_with_relations(2)
+        fields = {'id', 'price', 'tags', 'ingredients'}
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': ','.join(fields), 'expand': 'tags'},
+        )
+
+        results = json.loads(res.content)['results']
+        self.assertEqual(
+            JSONRenderer().render(results),
+            self._render_with_serializer(fields=fields, expand={'tags'}),
+        )
 
 
 class ImageUploadTests(TestCase):
@@ -457,8 +857,27 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        for name in self.recipe.image_renditions.values():
+            self.recipe.image.storage.delete(name)
         self.recipe.image.delete()
 
+    def _upload(self, img, image_format='JPEG', **params):
+        """ Upload an image to the recipe running queued jobs """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img.save(image_file, format=image_format, **params)
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    url,
+                    {'image': image_file},
+                    format='multipart',
+                )
+
+        self.recipe.refresh_from_db()
+        return res
+
     def test_upload_image(self):
         """ Test uploading an image to a recipe """
         url = image_upload_url(self.recipe.id)
@@ -470,9 +889,105 @@ class ImageUploadTests(TestCase):
             res = self.client.post(url, payload, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn('image', res.data)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotIn('image', res.data)
+        self.assertEqual(res.data['status'], ImageJob.PENDING)
+        url = f'http://testserver{detailt_url(self.recipe.id)}'
+        self.assertEqual(res.data['url'], url)
+        self.assertEqual(res['Location'], url)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.image, self.recipe.image.name)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_creates_renditions(self):
+        """ Test processing an upload creates resized renditions """
+        res = self._upload(Image.new('RGB', (2000, 1000)))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertIn('thumbnail_jpeg', self.recipe.image_renditions)
+        self.assertIn('medium_jpeg', self.recipe.image_renditions)
+        path = self.recipe.image.storage.path(
+            self.recipe.image_renditions['thumbnail_jpeg']
+        )
+        with Image.open(path) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 160))
+
+        res = self.client.get(detailt_url(self.recipe.id))
+
+        self.assertEqual(
+            set(res.data['renditions']),
+            set(self.recipe.image_renditions),
+        )
+        self.assertTrue(res.data['renditions']['thumbnail_jpeg'].startswith(
+            'http://testserver/'
+        ))
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_strips_metadata(self):
+        """ Test processing an upload removes the EXIF data """
+        img = Image.new('RGB', (10, 10))
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        self._upload(img, exif=exif.tobytes())
+
+        with Image.open(self.recipe.image.path) as stored:
+            self.assertEqual(len(stored.getexif()), 0)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_stored_under_new_name(self):
+        """ Test the stripped image replaces the upload once saved """
+        uploads = []
+        process_job = images.process_job
+
+        def record_upload(job_id):
+            uploads.append(Recipe.objects.get(id=self.recipe.id).image.name)
+            process_job(job_id)
+
+        with patch('recipe.images.process_job', record_upload):
+            self._upload(Image.new('RGB', (10, 10)))
+        upload, = uploads
+
+        self.assertNotEqual(self.recipe.image.name, upload)
+        self.assertFalse(self.recipe.image.storage.exists(upload))
+        self.assertTrue(self.recipe.image.storage.exists(
+            self.recipe.image.name
+        ))
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.image, self.recipe.image.name)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_multi_picture_image(self):
+        """ Test processing an MPO upload stores its primary image as JPEG """
+        img = Image.new('RGB', (10, 10))
+        self._upload(
+            img,
+            image_format='MPO',
+            save_all=True,
+            append_images=[Image.new('RGB', (10, 10))],
+        )
+
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.status, ImageJob.DONE)
+        with Image.open(self.recipe.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+        self.assertIn('thumbnail_jpeg', self.recipe.image_renditions)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_replaces_renditions(self):
+        """ Test uploading a new image deletes the old renditions """
+        self._upload(Image.new('RGB', (10, 10)))
+        old = list(self.recipe.image_renditions.values())
+        old_image = self.recipe.image.name
+
+        self._upload(Image.new('RGB', (10, 10)))
+
+        for name in old:
+            self.assertFalse(self.recipe.image.storage.exists(name))
+        self.assertEqual(len(self.recipe.image_renditions), len(old))
+        self.recipe.image.storage.delete(old_image)
 
     def test_upload_image_bad_request(self):
         """ Test uploading invalid image """
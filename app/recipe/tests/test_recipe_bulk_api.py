@@ -0,0 +1,465 @@
+"""
+Tests for the recipe bulk APIs
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    ImageJob,
+    Recipe,
+    RecipeStats,
+    Tag,
+    TagStats,
+    Ingredient)
+from recipe import bulk
+
+
+BULK_URL = reverse('recipe:recipe-bulk-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+BATCH_URL = reverse('recipe:recipe-batch')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_user(email='user@example.com', password='password'):
+    """ Create and return a new user """
+    return get_user_model().objects.create_user(email, password)
+
+
+def ndjson(*rows):
+    """ Encode rows as a NDJSON body """
+    return ''.join(
+        (row if isinstance(row, str) else json.dumps(row)) + '\n'
+        for row in rows
+    )
+
+
+def create_recipe(user, **params):
+    """ Create and return a sample recipe """
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('10.50'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def sample_row(**params):
+    """ Return a valid recipe import row """
+    row = {
+        'title': 'Imported recipe',
+        'time_minutes': 10,
+        'price': '4.50',
+    }
+    row.update(params)
+    return row
+
+
+class PublicRecipeBulkAPITests(TestCase):
+    """ Test unauthenticated bulk requests """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """ Test auth is required to import recipes """
+        res = self.client.post(
+            BULK_URL,
+            ndjson(sample_row()),
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeBulkAPITests(TestCase):
+    """ Test authenticated bulk requests """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def _import_lines(self, body):
+        """ Post a NDJSON body and return the decoded response lines """
+        res = self.client.post(
+            BULK_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content).decode()
+
+        return [json.loads(line) for line in content.splitlines()]
+
+    def _import(self, body):
+        """ Post a NDJSON body and return the row results of the import """
+        *results, summary = self._import_lines(body)
+        created = [r for r in results if r['status'] == 'created']
+        self.assertEqual(summary, {
+            'status': 'done',
+            'created': len(created),
+            'errors': len(results) - len(created),
+        })
+
+        return results
+
+    def test_import_recipes(self):
+        """ Test importing recipes with tags and ingredients """
+        Tag.objects.create(user=self.user, name='Quick')
+        body = ndjson(
+            sample_row(
+                title='Pancakes',
+                description='Fluffy',
+                tags=[{'name': 'Quick'}, {'name': 'Sweet'}],
+                ingredients=[{'name': 'Flour'}],
+            ),
+            sample_row(title='Toast', tags=[{'name': 'Quick'}]),
+        )
+
+        results = self._import(body)
+
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'created'],
+        )
+        pancakes = Recipe.objects.get(id=results[0]['id'])
+        self.assertEqual(pancakes.user, self.user)
+        self.assertEqual(pancakes.description, 'Fluffy')
+        self.assertEqual(
+            sorted(pancakes.tags.values_list('name', flat=True)),
+            ['Quick', 'Sweet'],
+        )
+        self.assertEqual(pancakes.ingredients.get().name, 'Flour')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_reports_invalid_rows(self):
+        """ Test invalid rows are reported without stopping the import """
+        body = ndjson(
+            sample_row(),
+            '{"title": ',
+            sample_row(price='not a price'),
+            '[1, 2]',
+            '',
+            sample_row(title='Last'),
+        )
+
+        results = self._import(body)
+
+        self.assertEqual(
+            [(result['line'], result['status']) for result in results],
+            [
+                (1, 'created'),
+                (2, 'error'),
+                (3, 'error'),
+                (4, 'error'),
+                (6, 'created'),
+            ],
+        )
+        self.assertIn('price', results[2]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    @patch('recipe.bulk.IMPORT_CHUNK_SIZE', 2)
+    def test_import_failure_reported(self):
+        """ Test an error midway ends the stream with a failed status """
+        body = ndjson(*[sample_row(title=f'Recipe {i}') for i in range(5)])
+        create_recipes = bulk.create_recipes
+
+        def fail_second_chunk(user, rows):
+            if Recipe.objects.filter(user=user).exists():
+                raise RuntimeError('Database unavailable')
+            return create_recipes(user, rows)
+
+        with patch('recipe.bulk.create_recipes', fail_second_chunk):
+            with self.assertLogs('recipe.bulk', 'ERROR'):
+                lines = self._import_lines(body)
+
+        self.assertEqual(
+            [(line.get('line'), line['status']) for line in lines],
+            [(1, 'created'), (2, 'created'), (None, 'failed')],
+        )
+        self.assertEqual(lines[-1]['created'], 2)
+        self.assertEqual(lines[-1]['errors'], 0)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_import_first_chunk_failure_error(self):
+        """ Test an error before any result is sent answers 500 """
+        body = ndjson(sample_row(), sample_row())
+        self.client.raise_request_exception = False
+
+        with patch(
+            'recipe.bulk.create_recipes',
+            side_effect=RuntimeError('Database unavailable'),
+        ):
+            with self.assertLogs('django.request', 'ERROR'):
+                res = self.client.post(
+                    BULK_URL,
+                    body,
+                    content_type='application/x-ndjson',
+                )
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    @patch('recipe.bulk.IMPORT_CHUNK_SIZE', 2)
+    def test_import_writes_in_chunks(self):
+        """ Test the queries per chunk do not depend on its rows """
+        def count_queries(rows):
+            body = ndjson(*[
+                sample_row(tags=[{'name': f'Tag {rows} {i}'}])
+                for i in range(rows)
+            ])
+            with CaptureQueriesContext(connection) as ctx:
+                self._import(body)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count_queries(4), 2 * count_queries(2))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 6)
+
+    def _export(self, **params):
+        """ Request an export and return its streamed content """
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """ Test exporting recipes as NDJSON with relations inlined """
+        other_user = create_user(email='other@example.com')
+        create_recipe(user=other_user)
+        r1 = create_recipe(user=self.user, title='Curry')
+        r2 = create_recipe(user=self.user, title='Rice', link='https://x.com')
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ingredient = Ingredient.objects.create(user=self.user, name='Chili')
+        r1.tags.add(tag)
+        r1.ingredients.add(ingredient)
+
+        res, content = self._export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [r2.id, r1.id])
+        self.assertEqual(rows[0]['link'], 'https://x.com')
+        self.assertEqual(rows[0]['tags'], [])
+        self.assertEqual(rows[1]['price'], '10.50')
+        self.assertEqual(rows[1]['tags'], [{'id': tag.id, 'name': 'Spicy'}])
+        self.assertEqual(
+            rows[1]['ingredients'],
+            [{'id': ingredient.id, 'name': 'Chili'}],
+        )
+
+    def test_export_csv(self):
+        """ Test exporting recipes as CSV """
+        recipe = create_recipe(user=self.user, title='Curry')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Hot'),
+            Tag.objects.create(user=self.user, name='Asian'),
+        )
+
+        res, content = self._export(format='csv')
+
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry')
+        self.assertEqual(rows[0]['tags'], 'Hot|Asian')
+        self.assertEqual(rows[0]['ingredients'], '')
+
+    def test_export_csv_escapes_formulas(self):
+        """ Test CSV cells a spreadsheet would evaluate are escaped """
+        recipe = create_recipe(
+            user=self.user,
+            title='=HYPERLINK("https://x.com")',
+            link='https://x.com',
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='@Spicy'))
+
+        res, content = self._export(format='csv')
+
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(rows[0]['title'], '\'=HYPERLINK("https://x.com")')
+        self.assertEqual(rows[0]['tags'], "'@Spicy")
+        self.assertEqual(rows[0]['link'], 'https://x.com')
+        self.assertEqual(rows[0]['price'], '10.50')
+
+    def test_export_applies_filters(self):
+        """ Test the export honours the recipe filters """
+        r1 = create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        r1.tags.add(tag)
+
+        res, content = self._export(tags=str(tag.id))
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [r1.id])
+
+    @patch('recipe.bulk.EXPORT_CHUNK_SIZE', 2)
+    def test_export_queries_per_chunk(self):
+        """ Test relations are fetched once per chunk of recipes """
+        for i in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'{i}'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res, content = self._export()
+
+        self.assertEqual(len(content.splitlines()), 5)
+        relation_queries = [
+            query for query in ctx.captured_queries
+            if 'core_recipe_tags' in query['sql']
+        ]
+        self.assertEqual(len(relation_queries), 3)
+
+    def _create_linked_recipes(self, count):
+        """ Create recipes sharing a tag, with an ingredient each """
+        tag = Tag.objects.get_or_create(user=self.user, name='Shared')[0]
+        recipes = []
+        for i in range(count):
+            recipe = create_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(Ingredient.objects.get_or_create(
+                user=self.user,
+                name=f'Item {i}',
+            )[0])
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_bulk_update_recipes(self):
+        """ Test partially updating recipes of the user in one request """
+        recipe1, recipe2 = self._create_linked_recipes(2)
+        other = create_recipe(create_user('other@example.com'))
+
+        res = self.client.patch(BATCH_URL, [
+            {'id': recipe1.id, 'title': 'Pumpkin soup', 'price': '5.00'},
+            {'id': recipe2.id, 'time_minutes': 40},
+            {'id': other.id, 'title': 'Stolen'},
+            {'id': 0, 'price': '1.00'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'updated': 2,
+            'missing': [other.id, 0],
+        })
+        updated1 = Recipe.objects.get(id=recipe1.id)
+        self.assertEqual(updated1.title, 'Pumpkin soup')
+        self.assertEqual(updated1.price, Decimal('5.00'))
+        self.assertEqual(updated1.time_minutes, recipe1.time_minutes)
+        self.assertGreater(updated1.updated_at, recipe1.updated_at)
+        self.assertEqual(Recipe.objects.get(id=recipe2.id).time_minutes, 40)
+        other.refresh_from_db()
+        self.assertEqual(other.title, 'Sample recipe')
+
+        res = self.client.get(RECIPES_URL, {'q': 'pumpkin'})
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe1.id],
+        )
+        stats = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(stats.price_total, Decimal('15.50'))
+        self.assertEqual(stats.time_minutes_total, 62)
+
+    def test_bulk_update_query_count_is_constant(self):
+        """ Test updating more recipes runs the same queries """
+        def update(recipes):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.patch(BATCH_URL, [
+                    {'id': recipe.id, 'price': '2.00'} for recipe in recipes
+                ], format='json')
+            self.assertEqual(res.data['updated'], len(recipes))
+            return len(queries)
+
+        self.assertEqual(
+            update(self._create_linked_recipes(2)),
+            update(self._create_linked_recipes(10)),
+        )
+
+    def test_bulk_update_invalid_error(self):
+        """ Test bulk updates need a list of valid changes with IDs """
+        recipe = create_recipe(self.user)
+
+        for body in [
+            {'id': recipe.id, 'price': '1.00'},
+            [{'price': '1.00'}],
+            [{'id': recipe.id, 'price': 'free'}],
+        ]:
+            res = self.client.patch(BATCH_URL, body, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.price, Decimal('10.50'))
+
+    def test_bulk_delete_recipes(self):
+        """ Test deleting recipes of the user with their links """
+        recipe1, recipe2, kept = self._create_linked_recipes(3)
+        ImageJob.objects.create(recipe=recipe1, image='image.jpg')
+        other = create_recipe(create_user('other@example.com'))
+        ids = [recipe1.id, recipe2.id, other.id, 0]
+
+        res = self.client.delete(
+            f'{BATCH_URL}?ids={",".join(map(str, ids))}',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'deleted': 2,
+            'detached': 4,
+            'missing': [other.id, 0],
+        })
+        self.assertEqual(
+            set(Recipe.objects.values_list('id', flat=True)),
+            {kept.id, other.id},
+        )
+        self.assertFalse(ImageJob.objects.exists())
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 3)
+        tag = Tag.objects.get(user=self.user)
+        self.assertEqual(TagStats.objects.get(tag=tag).recipe_count, 1)
+        stats = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(stats.recipe_count, 1)
+        self.assertEqual(stats.price_total, kept.price)
+
+    def test_bulk_delete_query_count_is_constant(self):
+        """ Test deleting more recipes runs the same queries """
+        def delete(recipes):
+            ids = ','.join(str(recipe.id) for recipe in recipes)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(f'{BATCH_URL}?ids={ids}')
+            self.assertEqual(res.data['deleted'], len(recipes))
+            return len(queries)
+
+        self.assertEqual(
+            delete(self._create_linked_recipes(2)),
+            delete(self._create_linked_recipes(10)),
+        )
+
+    def test_bulk_delete_requires_cleared_relations(self):
+        """ Test rows are not deleted while other rows may relate to them """
+        recipe = create_recipe(self.user)
+
+        with self.assertRaisesMessage(RuntimeError, 'core.ImageJob'):
+            bulk._delete_rows(Recipe, [recipe.id], [
+                Recipe.tags.through,
+                Recipe.ingredients.through,
+            ])
+
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
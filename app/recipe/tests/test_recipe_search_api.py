@@ -0,0 +1,173 @@
+"""
+Tests for the recipe search API
+"""
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-import')
+
+
+def create_recipe(user, **params):
+    """ Create and return a sample recipe """
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('10.50'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchApiTests(TestCase):
+    """ Test searching recipes """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        """ Search recipes returning the ids of the results """
+        res = self.client.get(RECIPES_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """ Test searching recipe titles and descriptions with stemming """
+        r1 = create_recipe(self.user, title='Baked potatoes')
+        r2 = create_recipe(self.user, description='Bake it for an hour')
+        create_recipe(self.user, title='Fresh salad')
+
+        self.assertCountEqual(self.search('baking'), [r1.id, r2.id])
+
+    def test_search_tags_and_ingredients(self):
+        """ Test searching the names of recipe tags and ingredients """
+        r1 = create_recipe(self.user)
+        r1.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        r2 = create_recipe(self.user)
+        r2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Vegan cheese')
+        )
+        create_recipe(self.user)
+
+        self.assertCountEqual(self.search('vegan'), [r1.id, r2.id])
+
+    def test_search_ranks_title_first(self):
+        """ Test title matches rank above description matches """
+        r1 = create_recipe(self.user, description='Served with curry sauce')
+        r2 = create_recipe(self.user, title='Curry')
+
+        self.assertEqual(self.search('curry'), [r2.id, r1.id])
+
+    def test_search_limited_to_user(self):
+        """ Test searching only returns recipes of the user """
+        other = get_user_model().objects.create_user('other@example.com')
+        create_recipe(other, title='Lasagna')
+        recipe = create_recipe(self.user, title='Lasagna')
+
+        self.assertEqual(self.search('lasagna'), [recipe.id])
+
+    def test_search_combined_with_filters(self):
+        """ Test searching recipes filtered by tag """
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        recipe = create_recipe(self.user, title='Pasta')
+        recipe.tags.add(tag)
+        create_recipe(self.user, title='Pasta')
+
+        self.assertEqual(self.search('pasta', tags=tag.id), [recipe.id])
+
+    def test_search_follows_relation_changes(self):
+        """ Test search results follow renamed and deleted tags """
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self.search('breakfast'), [])
+        self.assertEqual(self.search('brunch'), [recipe.id])
+
+        tag.delete()
+        self.assertEqual(self.search('brunch'), [])
+
+    def test_search_follows_cleared_relations(self):
+        """ Test search results follow a tag cleared from its recipes """
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+
+        tag.recipe_set.clear()
+
+        self.assertEqual(self.search('spicy'), [])
+
+    def test_search_updated_recipe(self):
+        """ Test search results follow recipe updates """
+        recipe = create_recipe(self.user, title='Soup')
+
+        res = self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Stew'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.search('soup'), [])
+        self.assertEqual(self.search('stew'), [recipe.id])
+
+    def test_search_imported_recipes(self):
+        """ Test recipes created by a bulk import are searchable """
+        body = json.dumps({
+            'title': 'Imported',
+            'time_minutes': 5,
+            'price': '1.00',
+            'tags': [{'name': 'Quick'}],
+        }) + '\n'
+
+        res = self.client.post(
+            BULK_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+        list(res.streaming_content)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(self.search('quick'), [recipe.id])
+
+    def test_search_web_syntax(self):
+        """ Test excluding words from the search """
+        r1 = create_recipe(self.user, title='Chicken curry')
+        create_recipe(self.user, title='Chicken curry with rice')
+
+        self.assertEqual(self.search('chicken -rice'), [r1.id])
+
+    def test_search_cursor_pagination(self):
+        """ Test paging through ranked search results """
+        recipes = [
+            create_recipe(self.user, title='Pie', description='Pie ' * i)
+            for i in range(5)
+        ]
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'q': 'pie', 'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [recipe['id'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
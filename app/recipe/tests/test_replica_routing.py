@@ -0,0 +1,171 @@
+"""
+Tests for reading the recipe APIs from database replicas
+"""
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from core import metrics, routers
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-import')
+REPLICA = 'replica_test'
+
+# Stand-in replica, a second connection to the test database of default
+connections.databases[REPLICA] = {
+    **connections.databases['default'],
+    'CONN_MAX_AGE': 0,
+    'TEST': {'MIRROR': 'default'},
+}
+
+
+def detail_url(recipe_id):
+    """ Create and return a recipe detail URL """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+@patch.dict(connections.databases['default'], {'CONN_MAX_AGE': 0})
+class ReplicaRoutingTests(TransactionTestCase):
+    """ Test safe requests read from a replica unless the user wrote
+
+    The replica connection only sees committed data, like a streaming
+    replica of the primary.
+    """
+
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        caches['default'].clear()
+        for counter in metrics.COUNTERS:
+            counter.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('1.50'),
+        )
+
+    def get_recipes(self):
+        """ List the recipes, returning the response and replica queries """
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, len(queries)
+
+    def test_list_reads_from_replica(self):
+        """ Test listing recipes queries the replica """
+        res, replica_queries = self.get_recipes()
+
+        self.assertGreater(replica_queries, 0)
+        self.assertEqual(res.data['results'][0]['id'], self.recipe.id)
+        self.assertEqual(metrics.DB_READ_REQUESTS.value(alias=REPLICA), 1)
+
+    def test_write_pins_user_to_primary(self):
+        """ Test the writer reads from the primary after a write """
+        res = self.client.post(RECIPES_URL, {
+            'title': 'New recipe',
+            'time_minutes': 10,
+            'price': Decimal('2.50'),
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res, replica_queries = self.get_recipes()
+
+        self.assertEqual(replica_queries, 0)
+        self.assertEqual(res.data['results'][0]['title'], 'New recipe')
+        self.assertEqual(metrics.DB_READ_REQUESTS.value(alias='default'), 1)
+
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'password',
+        )
+        self.client.force_authenticate(other)
+        res, replica_queries = self.get_recipes()
+
+        self.assertGreater(replica_queries, 0)
+
+    def test_failed_write_does_not_pin(self):
+        """ Test a rejected write keeps the reads on the replica """
+        res = self.client.patch(detail_url(self.recipe.id), {'price': 'x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res, replica_queries = self.get_recipes()
+
+        self.assertGreater(replica_queries, 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_primary(self):
+        """ Test reads stay on the primary when no replica is configured """
+        res, replica_queries = self.get_recipes()
+
+        self.assertEqual(replica_queries, 0)
+        self.assertEqual(len(res.data['results']), 1)
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_async_retrieve_reads_from_replica(self):
+        """ Test the worker threads of async views query the replica """
+        view = RecipeViewSet.as_view({'get': 'retrieve'})
+        request = APIRequestFactory().get(detail_url(self.recipe.id))
+        force_authenticate(request, user=self.user)
+
+        res = async_to_sync(view)(request, pk=self.recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], self.recipe.title)
+        self.assertGreater(
+            metrics.DB_CHECKOUTS.value(alias=REPLICA, reused='false'),
+            0,
+        )
+
+    @patch('recipe.bulk.IMPORT_CHUNK_SIZE', 1)
+    def test_streamed_import_pins_user_per_chunk(self):
+        """ Test the chunks written while an import streams pin the user """
+        body = ''.join(
+            json.dumps({
+                'title': f'Recipe {i}',
+                'time_minutes': 5,
+                'price': '1.50',
+            }) + '\n'
+            for i in range(2)
+        )
+        res = self.client.post(
+            BULK_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(routers.is_pinned(self.user.id))
+
+        # The pin of the response expired before the next chunk
+        caches[settings.DATABASE_REPLICA_PIN_CACHE].clear()
+        b''.join(res.streaming_content)
+
+        self.assertTrue(routers.is_pinned(self.user.id))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
@@ -0,0 +1,174 @@
+"""
+Tests for the recipe stats API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.seed import create_recipes
+
+
+STATS_URL = reverse('recipe:stats')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """ Create and return a recipe detail URL """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """ Create and return a sample recipe """
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 20,
+        'price': Decimal('10.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicStatsApiTests(TestCase):
+    """ Test unauthenticated API requests """
+
+    def test_auth_required(self):
+        """ Test auth is required to retrieve stats """
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """ Test the stats of authenticated users """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_no_recipes(self):
+        """ Test the stats of a user without recipes """
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'recipe_count': 0,
+            'average_price': None,
+            'average_time_minutes': None,
+            'tags': [],
+            'ingredients': [],
+        })
+
+    def test_stats_follow_api_writes(self):
+        """ Test creating, updating and deleting recipes updates stats """
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': Decimal('6.00'),
+            'tags': [{'name': 'Spicy'}, {'name': 'Dinner'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+        curry = res.data['id']
+        payload = {
+            'title': 'Wings',
+            'time_minutes': 15,
+            'price': Decimal('3.00'),
+            'tags': [{'name': 'Spicy'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+        wings = res.data['id']
+        self.client.patch(detail_url(wings), {'price': '5.00'})
+        self.client.patch(
+            detail_url(curry),
+            {'tags': [{'name': 'Spicy'}]},
+            format='json',
+        )
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 2)
+        self.assertEqual(res.data['average_price'], '5.50')
+        self.assertEqual(res.data['average_time_minutes'], 22.5)
+        spicy = Tag.objects.get(user=self.user, name='Spicy')
+        rice = Ingredient.objects.get(user=self.user, name='Rice')
+        self.assertEqual(res.data['tags'], [
+            {'id': spicy.id, 'name': 'Spicy', 'recipe_count': 2},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': rice.id, 'name': 'Rice', 'recipe_count': 1},
+        ])
+
+        self.client.delete(detail_url(curry))
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(res.data['average_price'], '5.00')
+        self.assertEqual(res.data['tags'][0]['recipe_count'], 1)
+        self.assertEqual(res.data['ingredients'], [])
+
+    def test_stats_follow_relation_changes(self):
+        """ Test links changed from either side are counted once """
+        r1 = create_recipe(self.user)
+        r2 = create_recipe(self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        r1.tags.add(tag1, tag2)
+        r1.tags.add(tag1)
+        tag1.recipe_set.add(r1, r2)
+        tag2.recipe_set.remove(r2)
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count']) for tag in res.data['tags']],
+            [('Vegan', 2), ('Quick', 1)],
+        )
+
+        tag1.recipe_set.clear()
+        r1.tags.remove(tag2)
+        tag2.delete()
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_stats_of_bulk_created_recipes(self):
+        """ Test recipes created in bulk are counted """
+        recipes = create_recipes(self.user, 5)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 5)
+        self.assertEqual(
+            sum(tag['recipe_count'] for tag in res.data['tags']),
+            sum(recipe.tags.count() for recipe in recipes),
+        )
+
+    def test_stats_limited_to_user(self):
+        """ Test the stats only count the recipes of the user """
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'password',
+        )
+        create_recipe(other).tags.add(Tag.objects.create(user=other, name='A'))
+        create_recipe(self.user)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_stats_query_count(self):
+        """ Test stats are read with a fixed number of queries """
+        create_recipes(self.user, 20)
+
+        with self.assertNumQueries(3):
+            self.client.get(STATS_URL)
@@ -2,18 +2,26 @@
 Tests for the Tag API
 """
 
+from decimal import Decimal
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
-from recipe.serializers import TagSerializer
+from core.models import Tag, TagStats, Recipe
+from recipe.filters import with_recipe_count
+from recipe.serializers import TagCountSerializer
 
 
 TAGS_URL = reverse('recipe:tag-list')
+SUGGEST_URL = reverse('recipe:tag-suggest')
+BATCH_URL = reverse('recipe:tag-batch-update')
+RECIPES_URL = reverse('recipe:recipe-list')
 
 
 def detail_url(tag_id):
@@ -54,11 +62,11 @@ class PrivateTagsAPITests(TestCase):
         Tag.objects.create(user=self.user, name='Hammy')
 
         res = self.client.get(TAGS_URL)
-        tags = Tag.objects.all().order_by('-name')
-        serializer = TagSerializer(tags, many=True)
+        tags = with_recipe_count(Tag.objects.all()).order_by('-name')
+        serializer = TagCountSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_tags_limited_to_user(self):
         """ Tests that the tags retrieved belong to the user """
@@ -69,9 +77,66 @@ class PrivateTagsAPITests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
+
+    def test_tags_recipe_count(self):
+        """ Test tags are listed with their number of recipes """
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ['Eggs', 'Toast']:
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=5,
+                price='1.00',
+            )
+            recipe.tags.add(tag1)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [
+            {'id': tag2.id, 'name': 'Lunch', 'recipe_count': 0},
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+        recipe.delete()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][1]['recipe_count'], 1)
+
+    def test_filter_tags_assigned_to_recipes(self):
+        """ Test listing tags by those assigned to recipes """
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Eggs',
+            time_minutes=5,
+            price='1.00',
+        )
+        recipe.tags.add(tag1)
+        other = Recipe.objects.create(
+            user=self.user,
+            title='Toast',
+            time_minutes=5,
+            price='1.00',
+        )
+        other.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_filter_assigned_only_invalid_error(self):
+        """ Test assigned_only only accepts 0 or 1 """
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_update_tag(self):
         """ Test updating a tag """
@@ -96,3 +161,252 @@ class PrivateTagsAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
+
+    def _create_tagged_recipe(self, *tags):
+        """ Create and return a recipe with tags """
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('2.00'),
+        )
+        recipe.tags.add(*tags)
+
+        return recipe
+
+    def test_bulk_rename_tags(self):
+        """ Test renaming several tags and searching their recipes """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        recipe = self._create_tagged_recipe(tag1)
+        other = Tag.objects.create(user=create_user('o@example.com'), name='X')
+        self.client.get(TAGS_URL)
+
+        res = self.client.patch(BATCH_URL, [
+            {'id': tag1.id, 'name': 'Plant based'},
+            {'id': tag2.id, 'name': 'Fast'},
+            {'id': other.id, 'name': 'Mine'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 2, 'missing': [other.id]})
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Plant based', 'Fast'],
+        )
+        other.refresh_from_db()
+        self.assertEqual(other.name, 'X')
+        self.assertGreater(
+            Recipe.objects.get(id=recipe.id).updated_at,
+            recipe.updated_at,
+        )
+        res = self.client.get(RECIPES_URL, {'q': 'plant'})
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_bulk_rename_to_existing_name_error(self):
+        """ Test bulk renaming to a taken name changes nothing """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+
+        res = self.client.patch(BATCH_URL, [
+            {'id': tag1.id, 'name': 'Tasty'},
+            {'id': tag2.id, 'name': 'Tasty'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag1.refresh_from_db()
+        self.assertEqual(tag1.name, 'Vegan')
+
+    def test_bulk_swap_tag_names(self):
+        """ Test two tags can swap their names in one bulk update """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+
+        res = self.client.patch(BATCH_URL, [
+            {'id': tag1.id, 'name': 'Quick'},
+            {'id': tag2.id, 'name': 'Vegan'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag1.refresh_from_db()
+        tag2.refresh_from_db()
+        self.assertEqual((tag1.name, tag2.name), ('Quick', 'Vegan'))
+
+    def test_bulk_delete_tags(self):
+        """ Test deleting several tags detaches them from recipes """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+        kept = Tag.objects.create(user=self.user, name='Cheap')
+        recipe = self._create_tagged_recipe(tag1, tag2, kept)
+        self._create_tagged_recipe(tag1)
+        other = Tag.objects.create(user=create_user('o@example.com'), name='X')
+
+        res = self.client.delete(
+            f'{BATCH_URL}?ids={tag1.id},{tag2.id},{other.id}',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'deleted': 2,
+            'detached': 3,
+            'missing': [other.id],
+        })
+        self.assertEqual(
+            set(Tag.objects.values_list('id', flat=True)),
+            {kept.id, other.id},
+        )
+        self.assertEqual(list(recipe.tags.all()), [kept])
+        self.assertEqual(
+            set(TagStats.objects.values_list('tag_id', flat=True)),
+            {kept.id},
+        )
+        out = StringIO()
+        call_command('sync_recipe_relations', '--check', stdout=out)
+        self.assertIn('Recipes in sync', out.getvalue())
+        res = self.client.get(RECIPES_URL, {'tags': str(tag1.id)})
+        self.assertEqual(res.data['results'], [])
+
+    def test_tags_cursor_pagination(self):
+        """ Test tags are paginated with a cursor by name """
+        for name in ['Apple', 'Banana', 'Cherry', 'Date']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        seen = [item['name'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['name'] for item in res.data['results']]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(seen, ['Date', 'Cherry', 'Banana', 'Apple'])
+
+    def test_update_tag_to_existing_name_error(self):
+        """ Test renaming a tag to a name already in use fails """
+        Tag.objects.create(user=self.user, name='Lunch')
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Lunch'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dinner')
+
+    def test_tags_list_served_from_cache(self):
+        """ Test an unchanged tag list costs no queries """
+        Tag.objects.create(user=self.user, name='Cached')
+        res = self.client.get(TAGS_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(TAGS_URL)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_tags_cache_invalidated_on_write(self):
+        """ Test tag and recipe writes invalidate the cached list """
+        tag = Tag.objects.create(user=self.user, name='Before')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        tag.name = 'After'
+        tag.save()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'After')
+
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Recipe',
+            time_minutes=5,
+            price='1.00',
+        )
+        recipe.tags.add(tag)
+        new_etag = self.client.get(TAGS_URL)['ETag']
+
+        self.assertNotEqual(new_etag, res['ETag'])
+
+    def test_tags_cache_is_per_user(self):
+        """ Test cached lists are not shared between users """
+        Tag.objects.create(user=self.user, name='Mine')
+        self.client.get(TAGS_URL)
+
+        other_user = create_user(email='other@example.com')
+        Tag.objects.create(user=other_user, name='Theirs')
+        self.client.force_authenticate(other_user)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'Theirs')
+
+    def suggest(self, text, **params):
+        """ Request suggestions returning their names """
+        res = self.client.get(SUGGEST_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [tag['name'] for tag in res.data]
+
+    def test_suggest_prefix_first(self):
+        """ Test suggestions complete prefixes before fuzzy matches """
+        for name in ['Chicken', 'Chickpea', 'Spicy chickpeas', 'Salad']:
+            Tag.objects.create(user=self.user, name=name)
+
+        self.assertEqual(
+            self.suggest('chick'),
+            ['Chicken', 'Chickpea', 'Spicy chickpeas'],
+        )
+        self.assertEqual(self.suggest('s'), ['Salad', 'Spicy chickpeas'])
+
+    def test_suggest_tolerates_typos(self):
+        """ Test suggestions match misspelled names """
+        Tag.objects.create(user=self.user, name='Vegetarian')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        self.assertEqual(self.suggest('vegeterian'), ['Vegetarian'])
+
+    def test_suggest_limit_capped(self):
+        """ Test the number of suggestions is limited and capped """
+        for i in range(30):
+            Tag.objects.create(user=self.user, name=f'Soup {i:02}')
+
+        self.assertEqual(len(self.suggest('soup')), 10)
+        self.assertEqual(len(self.suggest('soup', limit=3)), 3)
+        self.assertEqual(len(self.suggest('soup', limit=1000)), 25)
+
+    def test_suggest_invalid_params_error(self):
+        """ Test suggestions require a text and a valid limit """
+        for params in [{}, {'q': ' '}, {'q': 'a', 'limit': 'x'},
+                       {'q': 'a', 'limit': 0}]:
+            res = self.client.get(SUGGEST_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_suggest_limited_to_user(self):
+        """ Test suggestions only include tags of the user """
+        other_user = create_user(email='other@example.com')
+        Tag.objects.create(user=other_user, name='Breakfast')
+        tag = Tag.objects.create(user=self.user, name='Brunch')
+
+        res = self.client.get(SUGGEST_URL, {'q': 'br'})
+
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'Brunch'}])
+
+    def test_suggest_cached_until_write(self):
+        """ Test repeated suggestions are cached until tags change """
+        Tag.objects.create(user=self.user, name='Pasta')
+        self.suggest('pas')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('PAS'), ['Pasta'])
+
+        Tag.objects.create(user=self.user, name='Pastry')
+
+        self.assertEqual(self.suggest('pas'), ['Pasta', 'Pastry'])
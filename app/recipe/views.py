@@ -1,53 +1,380 @@
 """
 Views for the recipe APIs
 """
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.db.models import F, Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.translation import gettext as _
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiParameter,
     OpenApiTypes)
 from rest_framework import (
+    generics,
     viewsets,
     mixins,
     status)
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import (
     Recipe,
+    RecipeStats,
     Tag,
     Ingredient)
-from recipe import serializers
+from recipe import bulk, filters, images, listing, serializers
+from recipe.async_views import AsyncViewSetMixin
+from recipe.cache import (
+    CachedListMixin,
+    get_suggest_cache,
+    is_conditional,
+    make_etag,
+    set_validators,
+    versioned_key)
+from recipe.pagination import (
+    RecipeCursorPagination,
+    NameCursorPagination)
+from recipe.parsers import NDJSONParser
+from recipe.renderers import NDJSONRenderer, CSVRenderer
+from recipe.replicas import ReplicaReadMixin
+from user.authentication import CachingTokenAuthentication
+
+
+RECIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'q',
+        OpenApiTypes.STR,
+        description='Search text, results are ordered by relevance',
+    ),
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma separated list of tag IDs to filter',
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='Comma separated list of ingredient IDs to filter',
+    ),
+    OpenApiParameter(
+        'match',
+        OpenApiTypes.STR,
+        enum=filters.MATCH_CHOICES,
+        description='Match recipes with any or all of the given IDs',
+    ),
+]
+FIELD_SELECTION_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to include',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma separated list of relations to nest, the '
+                    'others are listed as IDs. All are nested by default',
+    ),
+]
+
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 25
+BATCH_MAX_IDS = 50
+BULK_MAX_IDS = 1000
+
+BULK_DELETE_PARAMETERS = [
+    OpenApiParameter(
+        'ids',
+        OpenApiTypes.STR,
+        required=True,
+        description=f'Comma separated list of up to {BULK_MAX_IDS} IDs '
+                    f'to delete',
+    ),
+]
+
+
+class BulkWriteMixin:
+    """ Update or delete many objects of the user in one request
+
+    Objects are picked by ID and every change runs in one transaction of
+    a fixed number of set-based statements, instead of a request, a
+    save and a cascade per object.
+    """
+    bulk_update_serializer_class = None
+
+    def _get_ids(self, limit):
+        """ Return the distinct IDs of the ids parameter, in their order """
+        value = self.request.query_params.get('ids', '')
+        try:
+            ids = list(dict.fromkeys(filters.params_to_ints(value)))
+        except ValueError:
+            raise ValidationError({
+                'ids': _('Must be a comma separated list of IDs'),
+            })
+        if len(ids) > limit:
+            raise ValidationError({
+                'ids': _('At most %(count)d IDs') % {'count': limit},
+            })
+
+        return ids
+
+    def _get_changes(self):
+        """ Return the {id: {field: value}} changes of the request body """
+        data = self.request.data
+        if isinstance(data, list) and len(data) > BULK_MAX_IDS:
+            raise ValidationError({
+                'non_field_errors': _('At most %(count)d items') % {
+                    'count': BULK_MAX_IDS,
+                },
+            })
+        serializer = self.bulk_update_serializer_class(
+            data=data,
+            many=True,
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
 
+        changes = {}
+        for item in serializer.validated_data:
+            item = dict(item)
+            changes.setdefault(item.pop('id'), {}).update(item)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+        return changes
+
+    def _updated_response(self, changes, updated):
+        """ Return the summary of a bulk update """
+        updated = set(updated)
+
+        return Response({
+            'updated': len(updated),
+            'missing': [pk for pk in changes if pk not in updated],
+        })
+
+    def _deleted_response(self, ids, deleted, detached):
+        """ Return the summary of a bulk delete """
+        deleted = set(deleted)
+
+        return Response({
+            'deleted': len(deleted),
+            'detached': detached,
+            'missing': [pk for pk in ids if pk not in deleted],
+        })
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=RECIPE_FILTER_PARAMETERS + FIELD_SELECTION_PARAMETERS,
+    ),
+    retrieve=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+)
+class RecipeViewSet(ReplicaReadMixin,
+                    AsyncViewSetMixin,
+                    BulkWriteMixin,
+                    viewsets.ModelViewSet):
     """ View for manage Recipe APIs """
     serializer_class = serializers.RecipeDetailSerializer
+    bulk_update_serializer_class = serializers.RecipeBulkUpdateSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachingTokenAuthentication]
     permission_classes = [IsAuthenticated]
-
-    def _params_to_ints(self, qs):
-        """ Convert a list of strings to integers """
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipeCursorPagination
+    # Actions whose response nests the recipe tags and ingredients
+    related_actions = ['list', 'retrieve', 'update', 'partial_update']
+    # Actions whose fields and nested relations the client can select
+    selectable_actions = ['list', 'retrieve', 'batch']
+    async_actions = ['list', 'retrieve']
 
     def get_queryset(self):
         """ Retrieve recipes for authenticated user """
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tags_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
-        if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
-
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+        relation_ids = {}
+        for relation in filters.RELATIONS:
+            value = self.request.query_params.get(relation)
+            if value:
+                relation_ids[relation] = filters.params_to_ints(value)
+        match = self.request.query_params.get('match', filters.MATCH_ANY)
+        if match not in filters.MATCH_CHOICES:
+            raise ValidationError({'match': _('Must be "any" or "all"')})
+
+        queryset = filters.filter_by_relations(
+            self.queryset.filter(user=self.request.user),
+            relation_ids,
+            match,
+        )
+        text = self.request.query_params.get('q', '').strip()
+        if text:
+            queryset = filters.search(queryset, text).order_by('-rank', '-id')
+        else:
+            queryset = queryset.order_by('-id')
+
+        return self._build_queryset(queryset)
+
+    def _build_queryset(self, queryset):
+        """ Adapt the queryset to what the current action serializes """
+        if self.action in self.selectable_actions:
+            serializer = self.get_serializer()
+            # The validators are built from the id and modification time
+            queryset = queryset.only(
+                'id',
+                'updated_at',
+                *serializer.get_model_fields(),
+            )
+            relations = [
+                relation
+                for relation in serializer.expandable_fields
+                if relation in serializer.fields
+            ]
+        elif self.action in self.related_actions:
+            serializer = None
+            relations = ['tags', 'ingredients']
+        else:
+            return queryset
+
+        for relation in relations:
+            if serializer is None or serializer.is_expanded(relation):
+                fields = ['id', 'name']
+            else:
+                fields = ['id']
+            model = queryset.model._meta.get_field(relation).related_model
+            queryset = queryset.prefetch_related(Prefetch(
+                relation,
+                queryset=model.objects.only(*fields).order_by('id'),
+            ))
+
+        return queryset
+
+    def _get_selection(self, param):
+        """ Return the set of names given in a query parameter or None """
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    def get_serializer_context(self):
+        """ Add the fields and relations selected by the client """
+        context = super().get_serializer_context()
+        if self.action in self.selectable_actions:
+            context['fields'] = self._get_selection('fields')
+            context['expand'] = self._get_selection('expand')
+
+        return context
+
+    def _get_validators(self, rows):
+        """ Return the ETag and Last-Modified timestamp of recipe rows
+
+        Only a single recipe has a Last-Modified timestamp. Recipes leaving
+        a list, by deletion or filtering, do not move the newest time of
+        its rows, so lists are only validated by their ETag.
+        """
+        states = [
+            (row['id'], row['updated_at']) if isinstance(row, dict)
+            else (row.id, row.updated_at)
+            for row in rows
+        ]
+        parts = [f'{pk}@{updated_at.isoformat()}' for pk, updated_at in states]
+        if self.action == 'list':
+            parts += [self.paginator.has_next, self.paginator.has_previous]
+        last_modified = None
+        if self.detail and states:
+            last_modified = int(states[0][1].timestamp())
+
+        return make_etag(self.request, *parts), last_modified
+
+    def _get_not_modified(self, rows):
+        """ Return a 304 response if the client copy of rows is fresh """
+        etag, last_modified = self._get_validators(rows)
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is not None:
+            set_validators(response, etag, last_modified)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """ List recipes, answering 304 before serializing when fresh """
+        queryset = self.filter_queryset(self.get_queryset())
+        if is_conditional(request):
+            states = queryset.prefetch_related(None).values(
+                'id',
+                'updated_at',
+                *queryset.query.annotations,
+            )
+            response = self._get_not_modified(self.paginate_queryset(states))
+            if response is not None:
+                return response
+
+        serializer = self.get_serializer()
+        if listing.RowSerializer.supports(serializer):
+            # Render from value rows, skipping model and field instances
+            rows = listing.RowSerializer(serializer)
+            page = self._paginate_rows(queryset, rows)
+            data = rows.to_representation(page)
+        else:
+            page = self.paginate_queryset(queryset)
+            data = self.get_serializer(page, many=True).data
+        response = self.get_paginated_response(data)
+
+        return set_validators(response, *self._get_validators(page))
+
+    async def alist(self, request, *args, **kwargs):
+        """ List recipes, reading the related objects of the page rows
+        concurrently
+        """
+        serializer = self.get_serializer()
+        if is_conditional(request) or not listing.RowSerializer.supports(
+            serializer
+        ):
+            return await sync_to_async(self.list)(request, *args, **kwargs)
+
+        rows = listing.RowSerializer(serializer)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self._paginate_rows)(queryset, rows)
+        data = await rows.ato_representation(page)
+        response = await sync_to_async(self.get_paginated_response)(data)
+
+        return set_validators(response, *self._get_validators(page))
+
+    def _paginate_rows(self, queryset, rows):
+        """ Return the page of the value rows read by a row serializer """
+        return self.paginate_queryset(queryset.prefetch_related(
+            None
+        ).values(*dict.fromkeys([
+            *rows.columns,
+            'updated_at',
+            *queryset.query.annotations,
+        ])))
+
+    def retrieve(self, request, *args, **kwargs):
+        """ Retrieve a recipe, answering 304 before serializing when fresh """
+        if is_conditional(request):
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            try:
+                states = list(self.get_queryset().prefetch_related(
+                    None
+                ).filter(
+                    **{self.lookup_field: self.kwargs[lookup]}
+                ).values('id', 'updated_at'))
+            except (TypeError, ValueError):
+                raise Http404
+            response = self._get_not_modified(states) if states else None
+            if response is not None:
+                return response
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data)
+
+        return set_validators(response, *self._get_validators([instance]))
 
     def get_serializer_class(self):
         """ Retrieve the serializer class for request """
@@ -55,45 +382,381 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk_import':
+            return serializers.RecipeImportSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         """ Create a new recipe """
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        responses={
+            status.HTTP_202_ACCEPTED: serializers.RecipeImageJobSerializer,
+        },
+    )
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """ Upload an image to a recipe """
+        """ Upload an image to a recipe and queue its processing
+
+        The upload is replaced once processed, so the response links to
+        the recipe, which shows the image and its renditions by then.
+        """
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            job = images.enqueue(recipe)
+            url = self.reverse_action('detail', args=[recipe.id])
+            data = {'id': recipe.id, 'status': job.status, 'url': url}
+            return Response(
+                data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': url},
+            )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                required=True,
+                description=f'Comma separated list of up to {BATCH_MAX_IDS} '
+                            f'recipe IDs',
+            ),
+            *FIELD_SELECTION_PARAMETERS,
+        ],
+        responses=serializers.RecipeBatchSerializer,
+    )
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def batch(self, request):
+        """ Retrieve several recipes in the requested order
+
+        The recipes and each nested relation are read with one query
+        whatever the number of IDs, after a 304 check of their IDs and
+        modification times for conditional requests. IDs of unknown
+        recipes, or of recipes of other users, are listed as missing.
+        """
+        ids = self._get_ids(BATCH_MAX_IDS)
+        queryset = self.get_queryset().filter(id__in=ids)
+        if is_conditional(request):
+            states = {
+                row['id']: row
+                for row in queryset.prefetch_related(None).values(
+                    'id',
+                    'updated_at',
+                )
+            }
+            response = self._get_not_modified(
+                [states[pk] for pk in ids if pk in states]
+            )
+            if response is not None:
+                return response
+
+        recipes = {recipe.id: recipe for recipe in queryset}
+        found = [recipes[pk] for pk in ids if pk in recipes]
+        response = Response({
+            'results': self.get_serializer(found, many=True).data,
+            'missing': [pk for pk in ids if pk not in recipes],
+        })
+
+        return set_validators(response, *self._get_validators(found))
+
+    @extend_schema(
+        request=serializers.RecipeBulkUpdateSerializer(many=True),
+        responses=serializers.BulkUpdateResultSerializer,
+    )
+    @batch.mapping.patch
+    def batch_update(self, request):
+        """ Partially update several recipes in one transaction """
+        changes = self._get_changes()
+        updated = bulk.update_recipes(request.user, changes)
+
+        return self._updated_response(changes, updated)
+
+    @extend_schema(
+        parameters=BULK_DELETE_PARAMETERS,
+        responses=serializers.BulkDeleteResultSerializer,
+    )
+    @batch.mapping.delete
+    def batch_destroy(self, request):
+        """ Delete several recipes in one transaction """
+        ids = self._get_ids(BULK_MAX_IDS)
+        deleted, detached = bulk.delete_recipes(request.user, ids)
+
+        return self._deleted_response(ids, deleted, detached)
+
+    @extend_schema(
+        request={'application/x-ndjson': serializers.RecipeImportSerializer},
+    )
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='bulk',
+        parser_classes=[NDJSONParser],
+        renderer_classes=[NDJSONRenderer],
+    )
+    def bulk_import(self, request):
+        """ Create recipes streamed as NDJSON, one recipe per line
+
+        The first chunk is written before answering, so its errors get
+        an error status. The response then streams a result per line as
+        the next chunks are committed and ends with a 'done' or 'failed'
+        status line, a body without it was cut by the connection.
+        """
+        results = bulk.import_recipes(
+            request.data,
+            self.get_serializer_context(),
+        )
+        first = next(results)
+        renderer = NDJSONRenderer()
 
-class BaseTagAndIngredientViewSet(mixins.DestroyModelMixin,
+        return StreamingHttpResponse(
+            renderer.render_stream(itertools.chain([first], results)),
+            content_type=renderer.media_type,
+        )
+
+    @extend_schema(
+        parameters=RECIPE_FILTER_PARAMETERS + [
+            OpenApiParameter(
+                'format',
+                OpenApiTypes.STR,
+                enum=['ndjson', 'csv'],
+                description='Export format, NDJSON by default',
+            ),
+        ],
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR},
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """ Stream the filtered recipes as NDJSON or CSV
+
+        The recipes are read while the response streams, once the view
+        returned and its replica routing ended, so they come from the
+        primary.
+        """
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.render_stream(bulk.export_recipes(self.get_queryset())),
+            content_type=renderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+
+        return response
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'assigned_only',
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description='Filter by items assigned to recipes',
+            ),
+        ],
+    ),
+)
+class BaseTagAndIngredientViewSet(ReplicaReadMixin,
+                                  AsyncViewSetMixin,
+                                  BulkWriteMixin,
+                                  CachedListMixin,
+                                  mixins.DestroyModelMixin,
                                   mixins.UpdateModelMixin,
                                   mixins.ListModelMixin,
                                   viewsets.GenericViewSet):
     """ Base viewset for recipe and tags """
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachingTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameCursorPagination
+    async_actions = ['list']
 
     def get_queryset(self):
         """ Filter queryset to authenticated user """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            if self._get_assigned_only():
+                queryset = filters.assigned_only(queryset)
+            queryset = filters.with_recipe_count(queryset)
 
+        return queryset.order_by('-name')
 
+    def get_serializer_class(self):
+        """ List objects with the number of their recipes """
+        if self.action == 'list':
+            return self.count_serializer_class
+
+        return self.serializer_class
+
+    def _get_assigned_only(self):
+        """ Return whether only objects used by recipes are requested """
+        value = self.request.query_params.get('assigned_only', '0')
+        if value not in ('0', '1'):
+            raise ValidationError({'assigned_only': _('Must be 0 or 1')})
+
+        return value == '1'
+
+    def _get_limit(self):
+        """ Return the number of suggestions requested, up to the cap """
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return SUGGEST_DEFAULT_LIMIT
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError({'limit': _('Must be a positive integer')})
+
+        return min(limit, SUGGEST_MAX_LIMIT)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                required=True,
+                description='Prefix or approximate name to complete',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description=f'Number of suggestions, at most '
+                            f'{SUGGEST_MAX_LIMIT}',
+            ),
+        ],
+    )
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def suggest(self, request):
+        """ Suggest names completing a prefix, tolerating typos """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': _('This parameter is required')})
+        limit = self._get_limit()
+
+        key = versioned_key(
+            f'suggest:{self.basename}',
+            request.user.pk,
+            text.lower(),
+            limit,
+        )
+        cache = get_suggest_cache()
+        data = cache.get(key)
+        if data is None:
+            data = filters.suggest(self.get_queryset(), text, limit)
+            cache.set(key, data)
+
+        return Response(data)
+
+    @extend_schema(
+        responses=serializers.BulkUpdateResultSerializer,
+    )
+    @action(methods=['PATCH'], detail=False, url_path='batch')
+    def batch_update(self, request):
+        """ Rename several objects in one transaction """
+        changes = self._get_changes()
+        try:
+            updated = bulk.update_named_objects(
+                self.queryset.model,
+                request.user,
+                changes,
+            )
+        except IntegrityError:
+            raise ValidationError({
+                'name': _('An object with this name already exists'),
+            })
+
+        return self._updated_response(changes, updated)
+
+    @extend_schema(
+        parameters=BULK_DELETE_PARAMETERS,
+        responses=serializers.BulkDeleteResultSerializer,
+    )
+    @batch_update.mapping.delete
+    def batch_destroy(self, request):
+        """ Delete several objects in one transaction, detaching them from
+        their recipes
+        """
+        ids = self._get_ids(BULK_MAX_IDS)
+        deleted, detached = bulk.delete_named_objects(
+            self.queryset.model,
+            request.user,
+            ids,
+        )
+
+        return self._deleted_response(ids, deleted, detached)
+
+
+@extend_schema_view(
+    batch_update=extend_schema(
+        request=serializers.TagBulkUpdateSerializer(many=True),
+    ),
+)
 class TagViewSet(BaseTagAndIngredientViewSet):
     """ Manage tags in the db """
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
+    bulk_update_serializer_class = serializers.TagBulkUpdateSerializer
     queryset = Tag.objects.all()
 
 
+@extend_schema_view(
+    batch_update=extend_schema(
+        request=serializers.IngredientBulkUpdateSerializer(many=True),
+    ),
+)
 class IngredientViewSet(BaseTagAndIngredientViewSet):
     """ Manage ingredients in the db """
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
+    bulk_update_serializer_class = (
+        serializers.IngredientBulkUpdateSerializer
+    )
     queryset = Ingredient.objects.all()
+
+
+class RecipeStatsView(ReplicaReadMixin, generics.RetrieveAPIView):
+    """ Recipe counts and averages of the authenticated user
+
+    Every value is read from running totals kept up to date on writes,
+    so the cost does not depend on the number of recipes.
+    """
+    serializer_class = serializers.RecipeStatsSerializer
+    authentication_classes = [CachingTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        """ Retrieve and return the stats of the authenticated user """
+        user = self.request.user
+        stats = RecipeStats.objects.filter(user=user).first()
+        count = stats.recipe_count if stats else 0
+
+        return {
+            'recipe_count': count,
+            'average_price': stats.price_total / count if count else None,
+            'average_time_minutes': (
+                round(stats.time_minutes_total / count, 1) if count else None
+            ),
+            'tags': self._recipe_counts(Tag, user),
+            'ingredients': self._recipe_counts(Ingredient, user),
+        }
+
+    def _recipe_counts(self, model, user):
+        """ Return the objects of a user used by recipes, most used first """
+        return model.objects.filter(
+            user=user,
+            stats__recipe_count__gt=0,
+        ).order_by('-stats__recipe_count', 'name').values(
+            'id',
+            'name',
+            recipe_count=F('stats__recipe_count'),
+        )
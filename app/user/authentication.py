@@ -0,0 +1,65 @@
+"""
+Authentication for the user API
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def _cache_key(key):
+    """ Return the cache key of a token without exposing the token """
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _get_caches():
+    """ Return the in-process cache followed by the optional shared one """
+    aliases = [
+        settings.TOKEN_AUTH_LOCAL_CACHE,
+        settings.TOKEN_AUTH_SHARED_CACHE,
+    ]
+    return [caches[alias] for alias in aliases if alias]
+
+
+def invalidate_token(key):
+    """ Forget the cached owner of a token """
+    for cache in _get_caches():
+        cache.delete(_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    """ Forget the cached owner of every token of a user """
+    keys = Token.objects.filter(user_id=user.pk).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """ Token authentication memoizing the user of each token
+
+    Users are kept in a bounded local memory (LRU) cache and, when
+    configured, in a shared cache, so most requests authenticate without
+    touching the database. Entries are dropped when the token is deleted
+    or its user saved; other processes only drop their local entry when
+    it expires, after TOKEN_AUTH_CACHE_TIMEOUT seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        """ Return the cached user of the token or look it up """
+        cache_key = _cache_key(key)
+        token = None
+        missed = []
+        for cache in _get_caches():
+            user = cache.get(cache_key)
+            if user is not None:
+                break
+            missed.append(cache)
+        else:
+            user, token = super().authenticate_credentials(key)
+
+        for cache in missed:
+            cache.set(cache_key, user)
+
+        return (user, token or Token(key=key, user=user))
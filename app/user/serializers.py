@@ -27,13 +27,11 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """ Update user """
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
 
-        return user
+        # Saving once also drops the cached token owner
+        return super().update(instance, validated_data)
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -0,0 +1,92 @@
+"""
+Tests for the caching token authentication
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+ME_URL = reverse('user:me')
+
+
+def create_user(**params):
+    """ Helper to create new user """
+    return get_user_model().objects.create_user(**params)
+
+
+class CachingTokenAuthenticationTests(TestCase):
+    """ Test authenticating with cached tokens """
+
+    def setUp(self):
+        caches['token_auth'].clear()
+        self.user = create_user(
+            email='test@example.com',
+            password='TestPassword123',
+            name='Nombre',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_owner_is_cached(self):
+        """ Test repeated requests do not look the token up """
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        """ Test unknown tokens are rejected and not cached """
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """ Test a deleted token stops authenticating """
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """ Test a deactivated user stops authenticating """
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cached_user(self):
+        """ Test updating the profile drops the cached user """
+        self.client.patch(ME_URL, {'name': 'New name', 'password': 'newpass1'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE='default')
+    def test_shared_cache_fills_local_cache(self):
+        """ Test a user found in the shared cache is cached locally """
+        caches['default'].clear()
+        self.client.get(ME_URL)
+        caches['token_auth'].clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)